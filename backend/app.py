@@ -18,12 +18,20 @@ from routes.recommendationRoutes import recommendation_routes
 # Initialize the Flask app
 app = Flask(__name__)
 
+# orjson-backed jsonify: encodes ObjectId, datetime and Decimal128 natively
+from utils.json_encoder import OrjsonProvider
+app.json = OrjsonProvider(app)
+
 # Initialize Flask-SocketIO
 #socketio = SocketIO(app, cors_allowed_origins="*")
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading", 
                     logger=True, engineio_logger=True, 
                     upgrade=True, allow_upgrades=True)
 
+# Coalesced, room-scoped live vote updates
+from utils.vote_broadcaster import VoteBroadcaster
+vote_broadcaster = VoteBroadcaster(socketio)
+
 # Enable CORS for all routes (can be restricted to specific domains)
 CORS(app)
 
@@ -81,6 +89,25 @@ app.register_blueprint(comment_routes, url_prefix="/comments")
 app.register_blueprint(interaction_routes, url_prefix="/interaction")
 app.register_blueprint(recommendation_routes, url_prefix="/recommendations")
 
+# Start the batched vote flusher when votes are counted in Redis
+from models.Poll import VOTE_MODE
+if VOTE_MODE == "counter":
+    from utils.db import db_instance
+    from utils.vote_counter import VoteCounterFlusher
+    vote_counter_flusher = VoteCounterFlusher(db_instance.get_collection("polls"))
+    vote_counter_flusher.start()
+
+# Keep the trending sets free of closed polls and their decay scores rebased
+from utils.db import db_instance
+from utils.trending import TrendingMaintainer
+trending_maintainer = TrendingMaintainer(db_instance.get_collection("polls"))
+trending_maintainer.start()
+
+# Maintained set of active poll ids for constant-cost random sampling
+from utils.active_polls import ActivePollsRefresher
+active_polls_refresher = ActivePollsRefresher(db_instance.get_collection("polls"))
+active_polls_refresher.start()
+
 @app.route('/')
 def index():
     return jsonify({"message": "Welcome to the API. This only has backend as of now"})
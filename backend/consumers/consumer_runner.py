@@ -0,0 +1,77 @@
+import os
+import signal
+import time
+import multiprocessing
+
+CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", os.cpu_count() or 1))
+CONSUMER_SHUTDOWN_TIMEOUT = float(os.getenv("CONSUMER_SHUTDOWN_TIMEOUT", 30))  # Seconds
+
+
+def run_consumer_worker(stop_event, recommendation_workers):
+    """One group member: Kafka hands it a share of the partitions of both topics."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The runner coordinates shutdown
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    import threading
+    from consumers.kafka_consumer import KafkaConsumerInstance
+
+    consumer = KafkaConsumerInstance(recommendation_workers=recommendation_workers)
+    threading.Thread(target=lambda: (stop_event.wait(), consumer.stop()), daemon=True).start()
+    consumer.run()
+
+
+class ConsumerRunner:
+    """
+    Spreads the interaction topics' partitions over a pool of consumer
+    processes in one consumer group. Producers key events by userId, so each
+    user's events land on one partition and are applied in order by the single
+    worker that owns it; Kafka rebalances partitions as workers join or leave.
+    """
+
+    def __init__(self, workers=CONSUMER_WORKERS):
+        self.workers = workers
+        # Share the cores between consumer workers and their recommendation pools
+        self.recommendation_workers = max(1, (os.cpu_count() or 1) // workers)
+        self.ctx = multiprocessing.get_context("spawn")  # MongoClient is not fork-safe
+        self.stop_event = self.ctx.Event()
+        self.processes = []
+
+    def _spawn(self):
+        process = self.ctx.Process(
+            target=run_consumer_worker,
+            args=(self.stop_event, self.recommendation_workers),
+            name=f"interaction-consumer-{len(self.processes)}",
+        )
+        process.start()
+        return process
+
+    def stop(self, *_):
+        print("🛑 Stopping consumer workers...")
+        self.stop_event.set()
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        self.processes = [self._spawn() for _ in range(self.workers)]
+        print(f"🚀 Started {self.workers} consumer workers")
+
+        # Replace crashed workers; the group rebalances their partitions meanwhile
+        while not self.stop_event.wait(1):
+            for i, process in enumerate(self.processes):
+                if not process.is_alive():
+                    print(f"⚠️ Consumer worker {process.name} exited ({process.exitcode}), restarting")
+                    self.processes[i] = self._spawn()
+
+        deadline = time.monotonic() + CONSUMER_SHUTDOWN_TIMEOUT
+        for process in self.processes:
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                print(f"⚠️ Consumer worker {process.name} did not stop in time, terminating")
+                process.terminate()
+        print("✅ Consumer workers stopped")
+
+
+# Run Consumer Workers
+if __name__ == "__main__":
+    ConsumerRunner().run()
@@ -0,0 +1,176 @@
+from bson import ObjectId
+from datetime import datetime, timezone
+from pymongo import InsertOne, UpdateOne
+from models.User import ENGAGEMENT_SCORES
+
+# Counter fields bumped by Poll.update_poll_engagement
+POLL_ENGAGEMENT_FIELDS = {
+    "view": "engagementMetrics.views",
+    "click": "engagementMetrics.clicks",
+    "vote": "engagementMetrics.votes",
+    "comment": "engagementMetrics.comments"
+}
+
+
+class UserState:
+    """In-memory copy of one user's like/dislike sets plus the writes folded so far."""
+
+    def __init__(self, user):
+        self.liked = set(user.get("likedPolls", []))
+        self.disliked = set(user.get("dislikedPolls", []))
+        self.initial_liked = set(self.liked)
+        self.initial_disliked = set(self.disliked)
+        self.history = []
+        self.score_change = 0
+
+
+class InteractionBatch:
+    """
+    Folds a batch of interaction events into one bulk_write per collection.
+    Replays the same rules as User.update_user_engagement,
+    User.update_poll_preference and Poll.update_poll_engagement, in event order.
+    """
+
+    def __init__(self, users):
+        self.users = {user["piUserId"]: UserState(user) for user in users}
+        self.interactions = []
+        self.poll_inc = {}  # {poll_id: {field: n}}
+        self.poll_reactions = {}  # {poll_id: {"likes"|"dislikes": ("inc"|"set", n)}}
+        self.touched = set()
+        self.skipped = 0
+
+    def add(self, topic, event):
+        user_id = event.get("userId")
+        poll_id = event.get("pollId")
+        action_type = event.get("actionType")
+        if not user_id or not poll_id or not action_type or not ObjectId.is_valid(poll_id):
+            self.skipped += 1
+            return
+
+        self.touched.add(user_id)
+        if topic == "user_interactions":
+            if user_id not in self.users:
+                self.skipped += 1  # update_user_engagement raises for unknown users
+                return
+            self._add_engagement(self.users[user_id], ObjectId(poll_id), action_type)
+            self.interactions.append(InsertOne({
+                "userId": str(user_id),
+                "pollId": str(poll_id),
+                "actionType": action_type,
+                "timestamp": datetime.now(timezone.utc)
+            }))
+        elif topic == "poll_preferences":
+            self._add_poll_engagement(poll_id, action_type)
+            if action_type not in ["view", "click"] and user_id in self.users:
+                self._add_preference(self.users[user_id], ObjectId(poll_id), action_type)
+
+    def _add_engagement(self, state, poll_obj_id, action_type):
+        score_change = ENGAGEMENT_SCORES.get(action_type, 0)
+        if action_type == "like":
+            if poll_obj_id in state.disliked:
+                score_change += 1
+            elif poll_obj_id not in state.liked:
+                score_change += 2
+        elif action_type == "dislike":
+            if poll_obj_id in state.liked:
+                score_change -= 2
+            elif poll_obj_id not in state.disliked:
+                score_change += 1
+        elif action_type == "neutral":
+            if poll_obj_id in state.liked:
+                score_change -= 2
+            elif poll_obj_id in state.disliked:
+                score_change -= 1
+
+        state.score_change += score_change
+        state.history.append({
+            "pollId": poll_obj_id,
+            "actionType": action_type,
+            "timestamp": datetime.now(timezone.utc)
+        })
+
+    def _add_preference(self, state, poll_obj_id, action):
+        # A like on a disliked poll (and vice versa) only moves it back to neutral
+        if action == "like":
+            if poll_obj_id in state.disliked:
+                state.disliked.discard(poll_obj_id)
+            else:
+                state.liked.add(poll_obj_id)
+        elif action == "dislike":
+            if poll_obj_id in state.liked:
+                state.liked.discard(poll_obj_id)
+            else:
+                state.disliked.add(poll_obj_id)
+        elif action == "neutral":
+            state.liked.discard(poll_obj_id)
+            state.disliked.discard(poll_obj_id)
+
+    def _add_poll_engagement(self, poll_id, action_type):
+        if action_type in POLL_ENGAGEMENT_FIELDS:
+            field = POLL_ENGAGEMENT_FIELDS[action_type]
+            counters = self.poll_inc.setdefault(poll_id, {})
+            counters[field] = counters.get(field, 0) + 1
+            return
+
+        reactions = self.poll_reactions.setdefault(poll_id, {})
+        if action_type in ("like", "dislike"):
+            bumped, reset = ("likes", "dislikes") if action_type == "like" else ("dislikes", "likes")
+            mode, value = reactions.get(bumped, ("inc", 0))
+            reactions[bumped] = (mode, value + 1)
+            reactions[reset] = ("set", 0)
+        elif action_type == "neutral":
+            reactions["likes"] = ("set", 0)
+            reactions["dislikes"] = ("set", 0)
+
+    def user_operations(self):
+        operations = []
+        for user_id, state in self.users.items():
+            if state.history:
+                operations.append(UpdateOne(
+                    {"piUserId": user_id},
+                    {"$push": {"interactionHistory": {"$each": state.history}},
+                     "$inc": {"engagementScore": state.score_change}}
+                ))
+            # $pull and $addToSet on the same array must be separate updates
+            pulls = {}
+            if state.initial_liked - state.liked:
+                pulls["likedPolls"] = {"$in": list(state.initial_liked - state.liked)}
+            if state.initial_disliked - state.disliked:
+                pulls["dislikedPolls"] = {"$in": list(state.initial_disliked - state.disliked)}
+            if pulls:
+                operations.append(UpdateOne({"piUserId": user_id}, {"$pull": pulls}))
+            adds = {}
+            if state.liked - state.initial_liked:
+                adds["likedPolls"] = {"$each": list(state.liked - state.initial_liked)}
+            if state.disliked - state.initial_disliked:
+                adds["dislikedPolls"] = {"$each": list(state.disliked - state.initial_disliked)}
+            if adds:
+                operations.append(UpdateOne({"piUserId": user_id}, {"$addToSet": adds}))
+        return operations
+
+    def poll_operations(self):
+        operations = []
+        for poll_id in set(self.poll_inc) | set(self.poll_reactions):
+            increments = dict(self.poll_inc.get(poll_id, {}))
+            sets = {}
+            for reaction, (mode, value) in self.poll_reactions.get(poll_id, {}).items():
+                target = increments if mode == "inc" else sets
+                target[f"engagementMetrics.{reaction}"] = value
+            update = {}
+            if increments:
+                update["$inc"] = increments
+            if sets:
+                update["$set"] = sets
+            operations.append(UpdateOne({"_id": ObjectId(poll_id)}, update))
+        return operations
+
+    def interaction_operations(self):
+        return self.interactions
+
+    def touched_polls(self):
+        """Polls whose engagement metrics this batch writes."""
+        return list(set(self.poll_inc) | set(self.poll_reactions))
+
+    def touched_users(self):
+        """Users whose recommendations should be refreshed after this batch."""
+        return list(self.touched)
@@ -27,8 +27,6 @@ class KafkaConsumerInstance:
         #Consume messages from Kafka and update models.
         print("🚀 Kafka Consumer Started Listening...")
 
-        MAX_RETRIES = 3  # Retry up to 3 times
-
         for message in self.consumer:
             event = message.value
             print(f"🔄 Processing event: {event}")
@@ -79,86 +77,241 @@ if __name__ == "__main__":
 
 
 
-from kafka import KafkaConsumer
+from kafka import KafkaConsumer, ConsumerRebalanceListener
+from kafka.coordinator.assignors.range import RangePartitionAssignor
 import json
+import os
+import threading
 from models.User import User
 from models.Poll import Poll
 from models.Interactions import Interaction
-from services.hybrid_recommender import HybridRecommender  # Import recommendation system
+from services.recommendation_scheduler import RecommendationRefreshScheduler  # Debounced recommendation refresh
+from services.recommendation_cache import RecommendationPrecomputer, touch as touch_recommendation_user
+from consumers.interaction_batch import InteractionBatch
 from utils.db import db_instance
+from utils import trending, poll_cache
+
+# "event" handles one message per transaction; "batch" folds polled batches
+# into one bulk_write per collection and commits offsets afterwards.
+KAFKA_CONSUMER_MODE = os.getenv("KAFKA_CONSUMER_MODE", "event")
+CONSUMER_BATCH_MAX_RECORDS = int(os.getenv("CONSUMER_BATCH_MAX_RECORDS", 500))
+CONSUMER_BATCH_TIMEOUT_MS = int(os.getenv("CONSUMER_BATCH_TIMEOUT_MS", 100))
+
+CONSUMER_TOPICS = ["user_interactions", "poll_preferences"]
 
 # Initialize models
 user_model = User()
 poll_model = Poll()
 interaction_model = Interaction()
 
+class CommitOnRevoke(ConsumerRebalanceListener):
+    """Commit processed offsets before partitions move to another worker."""
+
+    def __init__(self, consumer_instance):
+        self.consumer_instance = consumer_instance
+
+    def on_partitions_revoked(self, revoked):
+        if revoked and self.consumer_instance.mode == "batch":
+            self.consumer_instance.consumer.commit()
+        print(f"🔁 Partitions revoked: {sorted((tp.topic, tp.partition) for tp in revoked)}")
+
+    def on_partitions_assigned(self, assigned):
+        print(f"🔁 Partitions assigned: {sorted((tp.topic, tp.partition) for tp in assigned)}")
+
+
 class KafkaConsumerInstance:
     """Kafka Consumer to process interaction events and trigger recommendations."""
     
-    def __init__(self, topic="user_interactions", bootstrap_servers="localhost:9092", group_id="interaction_group"):
+    def __init__(self, topic="user_interactions", bootstrap_servers="localhost:9092", group_id="interaction_group", mode=KAFKA_CONSUMER_MODE,
+                 recommendation_workers=None):
+        self.mode = mode
         self.consumer = KafkaConsumer(
-            "user_interactions", "poll_preferences",  # Add both topics
             bootstrap_servers=bootstrap_servers,
             group_id=group_id,
             auto_offset_reset="earliest",
+            enable_auto_commit=(mode != "batch"),  # Batch mode commits only after its writes succeed
+            # Range assignment gives one worker the same partition number of both
+            # topics, so a user's keyed events (equal partition counts) stay together.
+            partition_assignment_strategy=[RangePartitionAssignor],
+            consumer_timeout_ms=1000,  # Lets the event loop notice a stop request while idle
             value_deserializer=lambda x: json.loads(x.decode("utf-8"))
         )
+        self.consumer.subscribe(CONSUMER_TOPICS, listener=CommitOnRevoke(self))  # Add both topics
         self.db_client = db_instance.client  # MongoDB client for transactions
+        if recommendation_workers:
+            self.recommendation_scheduler = RecommendationRefreshScheduler(workers=recommendation_workers)
+        else:
+            self.recommendation_scheduler = RecommendationRefreshScheduler()
+        # Web workers only queue refreshes; this process computes them and keeps active users warm
+        self.recommendation_precomputer = RecommendationPrecomputer(self.recommendation_scheduler)
+        self.stop_event = threading.Event()
+
+    def run(self):
+        """Start consuming in the configured mode until stop() is called."""
+        self.recommendation_precomputer.start()
+        try:
+            if self.mode == "batch":
+                self.process_batches()
+            else:
+                self.process_messages()
+        finally:
+            self.close()
+
+    def stop(self):
+        """Ask the consume loop to finish its current event or batch and exit."""
+        self.stop_event.set()
+
+    def close(self):
+        """Commit, leave the group (triggering a rebalance) and drain pending refreshes."""
+        try:
+            if self.mode == "batch":
+                self.consumer.commit()
+        finally:
+            self.consumer.close()
+            self.recommendation_precomputer.stop()
+            self.recommendation_scheduler.stop()
+
+    def process_batches(self):
+        """Consume polled batches, apply them with one bulk_write per collection, then commit offsets."""
+        print("🚀 Kafka Batch Consumer Started Listening...")
+
+        MAX_RETRIES = 3  # Retry up to 3 times
+
+        while not self.stop_event.is_set():
+            polled = self.consumer.poll(timeout_ms=CONSUMER_BATCH_TIMEOUT_MS, max_records=CONSUMER_BATCH_MAX_RECORDS)
+            records = sorted(
+                (record for partition_records in polled.values() for record in partition_records),
+                key=lambda record: record.timestamp
+            )
+            if not records:
+                continue
+
+            for attempt in range(MAX_RETRIES):
+                try:
+                    batch = self.apply_batch(records)
+                    print(f"✅ Batch processed: {len(records)} events ({batch.skipped} skipped)")
+                    break
+                except Exception as e:
+                    print(f"❌ Error processing batch (Attempt {attempt + 1}): {e}")
+            else:
+                # Never commit past events that were not written: rewind and poll them again
+                print("❌ Max retry attempts reached. Rewinding batch for redelivery.")
+                for partition, partition_records in polled.items():
+                    if partition_records:
+                        self.consumer.seek(partition, partition_records[0].offset)
+                self.stop_event.wait(1)  # Back off before the batch comes round again
+                continue
+
+            self.consumer.commit()
+
+            # ✅ After processing, schedule a (debounced) recommendation refresh per user
+            touched = batch.touched_users()
+            touch_recommendation_user(*touched)  # Keeps them in the precompute set
+            for user_id in touched:
+                self.recommendation_scheduler.mark_dirty(user_id)
+
+    def apply_batch(self, records):
+        """Fold records in memory and write them in a single transaction."""
+        user_ids = {record.value.get("userId") for record in records if record.value.get("userId")}
+        users = user_model.collection.find(
+            {"piUserId": {"$in": list(user_ids)}}, {"piUserId": 1, "likedPolls": 1, "dislikedPolls": 1}
+        )
+        batch = InteractionBatch(users)
+        for record in records:
+            batch.add(record.topic, record.value)
+
+        with self.db_client.start_session() as session:
+            with session.start_transaction():
+                for collection, operations in (
+                    (user_model.collection, batch.user_operations()),
+                    (poll_model.collection, batch.poll_operations()),
+                    (interaction_model.collection, batch.interaction_operations()),
+                ):
+                    if operations:
+                        collection.bulk_write(operations, ordered=True, session=session)
+
+        poll_cache.invalidate(*batch.touched_polls())  # Engagement metrics changed
+
+        # Batched writes bypass update_poll_engagement, so feed trending here, after
+        # the commit. Like process_message, only poll_preferences events count: the
+        # same actions are mirrored on user_interactions, and votes and comments are
+        # recorded by their controllers.
+        preferences = [record.value for record in records if record.topic == "poll_preferences"]
+        topics = {
+            poll_id: poll_model.get_trending_topics(poll_id)
+            for poll_id in {event.get("pollId") for event in preferences}
+            if poll_id
+        }
+        trending.record_engagements(
+            (event.get("pollId"), event.get("actionType"), topics.get(event.get("pollId")))
+            for event in preferences
+        )
+        return batch
 
     def process_messages(self):
         """Consume messages from Kafka, update models, and trigger recommendations."""
         print("🚀 Kafka Consumer Started Listening...")
 
+        while not self.stop_event.is_set():
+            for message in self.consumer:  # Ends after consumer_timeout_ms without messages
+                self.process_message(message)
+                if self.stop_event.is_set():
+                    break
+
+    def process_message(self, message):
+        """Apply one event in its own transaction."""
         MAX_RETRIES = 3  # Retry up to 3 times
 
-        for message in self.consumer:
-            event = message.value
-            print(f"🔄 Processing event: {event}")
+        event = message.value
+        print(f"🔄 Processing event: {event}")
 
-            user_id = event.get("userId")
-            poll_id = event.get("pollId")
-            action_type = event.get("actionType")
+        user_id = event.get("userId")
+        poll_id = event.get("pollId")
+        action_type = event.get("actionType")
 
-            if not user_id or not poll_id or not action_type:
-                print("⚠️ Skipping invalid event")
-                continue
+        if not user_id or not poll_id or not action_type:
+            print("⚠️ Skipping invalid event")
+            return
 
-            session = self.db_client.start_session()  # Start transaction session
-            
-            for attempt in range(MAX_RETRIES):
-                try:
-                    with session.start_transaction():
-                        if message.topic == "user_interactions":
-                            print(f"✅ Inside USER_INTERACTION inside consumer (Attempt {attempt + 1})")
-                            user_model.update_user_engagement(user_id, poll_id, action_type, session)
-                            interaction_model.log_interaction(user_id, poll_id, action_type, session)
+        session = self.db_client.start_session()  # Start transaction session
+        
+        for attempt in range(MAX_RETRIES):
+            try:
+                with session.start_transaction():
+                    if message.topic == "user_interactions":
+                        print(f"✅ Inside USER_INTERACTION inside consumer (Attempt {attempt + 1})")
+                        user_model.update_user_engagement(user_id, poll_id, action_type, session)
+                        interaction_model.log_interaction(user_id, poll_id, action_type, session)
 
-                        elif message.topic == "poll_preferences":
-                            print(f"✅ Inside POLL_PREFERENCE inside consumer (Attempt {attempt + 1})")
-                            poll_model.update_poll_engagement(poll_id, action_type, session)
-                            if action_type not in ["view", "click"]:
-                                user_model.update_poll_preference(user_id, poll_id, action_type, session)
-                    
-                    print(f"✅ Event processed: {user_id} {action_type} on poll {poll_id}")
+                    elif message.topic == "poll_preferences":
+                        print(f"✅ Inside POLL_PREFERENCE inside consumer (Attempt {attempt + 1})")
+                        poll_model.update_poll_engagement(poll_id, action_type, session)
+                        if action_type not in ["view", "click"]:
+                            user_model.update_poll_preference(user_id, poll_id, action_type, session)
+                
+                print(f"✅ Event processed: {user_id} {action_type} on poll {poll_id}")
+                if message.topic == "poll_preferences":
+                    poll_cache.invalidate(poll_id)  # Drop anything refilled from pre-commit data
+                    poll_model.record_trending(poll_id, action_type)  # Only committed events count
 
-                    # ✅ After processing, trigger recommendation update
-                    HybridRecommender.update_recommendations(user_id)
-                    print(f"🎯 Recommendations updated for user {user_id}")
+                # ✅ After processing, schedule a (debounced) recommendation refresh
+                touch_recommendation_user(user_id)
+                self.recommendation_scheduler.mark_dirty(user_id)
 
-                    break  # Exit retry loop on success
+                break  # Exit retry loop on success
 
-                except Exception as e:
-                    print(f"❌ Error processing event (Attempt {attempt + 1}): {e}")
-                    if session.in_transaction:
-                        session.abort_transaction()
-                    
-                    if attempt == MAX_RETRIES - 1:
-                        print("❌ Max retry attempts reached. Skipping event.")
+            except Exception as e:
+                print(f"❌ Error processing event (Attempt {attempt + 1}): {e}")
+                if session.in_transaction:
+                    session.abort_transaction()
+                
+                if attempt == MAX_RETRIES - 1:
+                    print("❌ Max retry attempts reached. Skipping event.")
 
-                finally:
-                    session.end_session()  # Close session after transaction
+            finally:
+                session.end_session()  # Close session after transaction
 
 # Run Consumer
 if __name__ == "__main__":
     consumer = KafkaConsumerInstance()
-    consumer.process_messages()
+    consumer.run()
@@ -3,12 +3,12 @@ from models.Comments import Comment
 from models.User import User  # Import User model
 from models.Poll import Poll  # Import Poll model
 from utils.redis_session import get_session 
+from utils.pagination import parse_page_args
+from utils import poll_cache
 from utils.db import db_instance
-from services.sentiment_analysis import analyze_sentiment  # Assuming sentiment analysis service exists
+from services.sentiment_worker import sentiment_worker  # Micro-batched sentiment analysis
 from pymongo import MongoClient
 from pymongo.errors import PyMongoError
-import asyncio
-import concurrent.futures
 import threading
 import logging
 from controllers.interactionController import InteractionController
@@ -68,8 +68,9 @@ class CommentController:
                     session.abort_transaction()  
                     return jsonify({"success": False, "message": "Failed to log the interaction. Transaction aborted."}), 500  
 
-            executor = concurrent.futures.ThreadPoolExecutor()
-            executor.submit(asyncio.run, self.update_sentiment_async(comment_id, text))
+            poll_cache.invalidate(poll_id)  # Drop anything refilled from pre-commit data
+            self.poll_model.record_trending(poll_id, "comment")  # Only once the comment is committed
+            sentiment_worker.submit(comment_id, text)
 
             return jsonify({"success": True, "message": "Comment created successfully", "data": comment_id}), 201
         except PyMongoError as e:
@@ -98,8 +99,11 @@ class CommentController:
             return jsonify({"success": False, "message": "Missing required parameter: pollId"}), 400
         
         try:
-            comments = self.comment_model.get_comments_by_poll(poll_id)
-            return jsonify({"success": True, "data": comments}), 200
+            page_size, cursor = parse_page_args(request.args)
+            comments, next_cursor = self.comment_model.get_comments_by_poll(poll_id, page_size, cursor)
+            return jsonify({"success": True, "data": comments, "next": next_cursor}), 200
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
         except Exception as e:
             return jsonify({"success": False, "message": f"Failed to fetch comments: {str(e)}"}), 500
 
@@ -116,43 +120,6 @@ class CommentController:
                 return jsonify({"success": False, "message": f"Failed to fetch comments: {str(e)}"}), 500
 
 
-    MAX_RETRIES = 3
-
-    async def update_sentiment_async(self, comment_id, text):
-        """Runs sentiment analysis with retries and updates the database asynchronously."""
-        logger.info(f"🔄 Async Task Running in thread ID: {threading.get_ident()}")  # ✅ Log async thread
-        try:
-            # Ensure comment_model is available
-            if not hasattr(self, "comment_model") or self.comment_model is None:
-                logger.info("❌ Error: comment_model not found.")
-                return
-            
-            # Mark comment as "processing"
-            await asyncio.to_thread(self.comment_model.update_comment_sentiment, comment_id, None, "processing")
-            # ✅ Manually add a delay to simulate long processing
-            #await asyncio.sleep(10)  # 🔥 Sleep for 10 seconds so you can check the database
-            for attempt in range(1, self.MAX_RETRIES + 1):
-                try:
-                    sentiment_score, sentiment_label = await analyze_sentiment(text)
-                    # Ensure sentiment_score is a native Python float
-                    sentiment_score = float(sentiment_score)
-                    # Update database with sentiment result
-                    await asyncio.to_thread(self.comment_model.update_comment_sentiment, comment_id, sentiment_score, sentiment_label)
-                    logger.info(f"✅ Sentiment updated in thread {threading.get_ident()}")
-
-                    return  # Success, exit function
-
-                except Exception as e:
-                    logger.info(f"⚠️ Attempt {attempt}: Sentiment Analysis Failed for {comment_id} - {e}")
-                    await asyncio.sleep(2)  # Wait before retrying
-            
-            # If all retries fail, mark sentiment as "error"
-            await asyncio.to_thread(self.comment_model.update_comment_sentiment, comment_id, None, "error")
-
-        except Exception as e:
-            logger.info(f"❌ Fatal error in update_sentiment_async: {e}")
-
-
     def handle_update_comment_sentiment(self, request, comment_id):
         """Handles comment sentiment asynchronously via background task."""
         if not comment_id:
@@ -166,18 +133,11 @@ class CommentController:
             if not comment:
                 return jsonify({"success": False, "message": "Comment not found"}), 404
 
-            # 🚀 Run async function in background properly
-            loop = asyncio.get_running_loop()
-            loop.create_task(self.update_sentiment_async(comment_id, comment["text"]))
+            # 🚀 Queue for the next sentiment batch
+            sentiment_worker.submit(comment_id, comment["text"])
 
             return jsonify({"success": True, "message": "Comment received, sentiment update in progress"}), 200
 
-        except RuntimeError:  # If no running event loop, create one
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(self.update_sentiment_async(comment_id, comment["text"]))
-            return jsonify({"success": True, "message": "Comment received, sentiment updated"}), 200
-
         except Exception as e:
             return jsonify({"success": False, "message": f"Failed to start sentiment update: {str(e)}"}), 500
 
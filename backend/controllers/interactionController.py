@@ -1,9 +1,10 @@
 from flask import request, jsonify
 from datetime import datetime, timezone
 from pymongo.errors import PyMongoError
-from utils.kafka_producer import KafkaProducerInstance  # Kafka Producer for events
+from utils.kafka_producer import kafka_producer  # Shared Kafka Producer for events
 from models.Interactions import Interaction
 from utils.redis_session import get_session
+from utils.pagination import parse_page_args
 from utils.db import db_instance
 from models.Poll import Poll
 from models.User import User
@@ -12,7 +13,6 @@ from models.User import User
 interaction_model = Interaction()
 poll_model = Poll()
 user_model = User()
-kafka_producer = KafkaProducerInstance()
 
 class InteractionController:
     def __init__(self):
@@ -41,24 +41,33 @@ class InteractionController:
     def handle_get_user_interactions(self, user_id):
         """Retrieves all interactions of a user."""
         try:
-            interactions = self.interaction_model.get_interactions_by_user(user_id)
-            return jsonify({"success": True, "data": interactions}), 200
+            page_size, cursor = parse_page_args(request.args)
+            interactions, next_cursor = self.interaction_model.get_interactions_by_user(user_id, page_size, cursor)
+            return jsonify({"success": True, "data": interactions, "next": next_cursor}), 200
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
         except PyMongoError as e:
             return jsonify({"success": False, "message": f"Database error: {e}"}), 500
 
     def handle_get_poll_interactions(self, poll_id):
         """Retrieves all interactions related to a poll."""
         try:
-            interactions = self.interaction_model.get_interactions_by_poll(poll_id)
-            return jsonify({"success": True, "data": interactions}), 200
+            page_size, cursor = parse_page_args(request.args)
+            interactions, next_cursor = self.interaction_model.get_interactions_by_poll(poll_id, page_size, cursor)
+            return jsonify({"success": True, "data": interactions, "next": next_cursor}), 200
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
         except PyMongoError as e:
             return jsonify({"success": False, "message": f"Database error: {e}"}), 500
 
     def handle_get_interactions_by_type(self, action_type):
         """Retrieves interactions of a specific type (view, click, vote, comment)."""
         try:
-            interactions = self.interaction_model.get_interactions_by_type(action_type)
-            return jsonify({"success": True, "data": interactions}), 200
+            page_size, cursor = parse_page_args(request.args)
+            interactions, next_cursor = self.interaction_model.get_interactions_by_type(action_type, page_size, cursor)
+            return jsonify({"success": True, "data": interactions, "next": next_cursor}), 200
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
         except PyMongoError as e:
             return jsonify({"success": False, "message": f"Database error: {e}"}), 500
         
@@ -78,7 +87,7 @@ class InteractionController:
                 "pollId": poll_id,
                 "actionType": action_type,
                 "timestamp": datetime.now(timezone.utc).isoformat()
-            })
+            }, key=user_id)  # Keyed by user so one consumer applies a user's events in order
             
             return jsonify({"success": True, "message": "Interaction logged successfully"}), 201
 
@@ -114,11 +123,9 @@ class InteractionController:
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
 
-            print(f"📌 Sending poll_preferences message: {poll_preference_message}")
-            self.kafka_producer.send_message("poll_preferences", poll_preference_message)
-
-            print(f"📌 Sending user_interactions message: {interaction_message}")
-            self.kafka_producer.send_message("user_interactions", interaction_message)
+            # Both messages share one producer batch in async mode
+            self.kafka_producer.send_message("poll_preferences", poll_preference_message, key=user_id)
+            self.kafka_producer.send_message("user_interactions", interaction_message, key=user_id)
 
             return jsonify({"success": True, "message": f"Poll {action}d successfully"}), 200
 
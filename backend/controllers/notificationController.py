@@ -1,6 +1,7 @@
 from flask import request, jsonify
 from models.Notification import Notification
-from utils.redis_session import get_session  
+from utils.redis_session import get_session
+from utils.pagination import parse_page_args  
 
 notification_model = Notification()
 
@@ -60,8 +61,11 @@ def handle_get_notifications_by_user(request):
     status = request.args.get('status', None)
 
     try:
-        notifications = notification_model.get_notifications_by_user(user_id, status)
-        return jsonify({"success": True, "data": str(notifications)}), 200
+        page_size, cursor = parse_page_args(request.args)
+        notifications, next_cursor = notification_model.get_notifications_by_user(user_id, status, page_size, cursor)
+        return jsonify({"success": True, "data": notifications, "next": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "message": f"Failed to fetch notifications for user: {str(e)}"}), 500
 
@@ -1,5 +1,6 @@
 from flask import request, jsonify
 from models.Payment import Payment
+from utils.pagination import parse_page_args
 from utils.redis_session import get_session  # Assuming you have a utility to fetch session data from Redis
 
 payment_model = Payment()
@@ -52,8 +53,11 @@ def handle_get_payments_by_user(request):
         return jsonify({"success": False, "message": error}), 401
 
     try:
-        payments = payment_model.get_payments_by_user(user_id)
-        return jsonify({"success": True, "data": str(payments)}), 200
+        page_size, cursor = parse_page_args(request.args)
+        payments, next_cursor = payment_model.get_payments_by_user(user_id, page_size, cursor)
+        return jsonify({"success": True, "data": payments, "next": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "message": f"Failed to fetch payments for user: {str(e)}"}), 500
 
@@ -61,8 +65,11 @@ def handle_get_payments_by_user(request):
 # Get Payments for Poll - Get all payments for a specific poll
 def handle_get_payments_for_poll(request, poll_id):
     try:
-        payments = payment_model.get_payments_for_poll(poll_id)
-        return jsonify({"success": True, "data": str(payments)}), 200
+        page_size, cursor = parse_page_args(request.args)
+        payments, next_cursor = payment_model.get_payments_for_poll(poll_id, page_size, cursor)
+        return jsonify({"success": True, "data": payments, "next": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "message": f"Failed to fetch payments for poll: {str(e)}"}), 500
 
@@ -1,5 +1,5 @@
 from pymongo.errors import PyMongoError,WriteConcernError
-from models.Poll import Poll
+from models.Poll import Poll, VOTE_MODE
 from models.Payment import Payment
 from models.User import User
 from utils.db import db_instance
@@ -7,6 +7,8 @@ from flask import jsonify,request
 from datetime import datetime, timezone
 from bson import ObjectId
 from utils.redis_session import get_session
+from utils.pagination import parse_page_args
+from utils import poll_cache
 from controllers.interactionController import InteractionController
 import time
 
@@ -90,6 +92,7 @@ class PollController:
                 self.user_model.add_poll_to_user(user_id, poll_id)
 
                 session.commit_transaction()  # Commit the transaction
+                self.poll_model.on_poll_created(poll_id)  # IDF and active set only see committed polls
                 return jsonify({"success": True, "data": {"pollId": str(poll_id)}}), 201
 
         except Exception as e:
@@ -134,6 +137,8 @@ class PollController:
                         session=session
                     )
                 session.commit_transaction()
+                # Drop anything refilled from pre-commit data and sync the active set
+                self.poll_model.on_poll_updated(poll_id)
                 return jsonify({"success": True, "message": "Poll updated successfully"}), 200
         except PyMongoError as e:
             if session.in_transaction:  # ✅ Only abort if transaction is still active
@@ -210,8 +215,9 @@ class PollController:
                 try:
                     with self.db_client.start_session() as session:
                         with session.start_transaction():
-                            self.poll_model.add_vote(poll_id, option_id, user_id, session)
+                            # Unique (pollId, userId) index rejects concurrent double votes
                             self.user_model.add_vote_to_user(user_id, poll_id, option_id, session)
+                            vote_ticket = self.poll_model.add_vote(poll_id, option_id, user_id, session)
 
                             # Log interaction
                             interaction_controller = InteractionController()  
@@ -221,6 +227,17 @@ class PollController:
                                 return jsonify({"success": False, "message": "Failed to log the interaction. Transaction aborted."}), 500  
 
                         session.commit_transaction()
+                        poll_cache.invalidate(poll_id)  # Drop anything refilled from pre-commit data
+
+                        # Counter mode counts the vote in Redis only once the vote record is committed
+                        if VOTE_MODE == "counter":
+                            try:
+                                self.poll_model.record_counted_vote(poll_id, option_id, vote_ticket)
+                            except Exception:
+                                # Limit filled up since validation, or Redis failed: the vote was
+                                # never counted, so drop the record and let the user retry
+                                self.user_model.remove_vote_from_user(user_id, poll_id)
+                                raise
                         print(f"✅ Vote added successfully (Attempt {attempt + 1})")
 
                         # ✅ Emit WebSocket event for live updates
@@ -228,15 +245,18 @@ class PollController:
 
 
                     # ✅ Engagement Update (Retries if needed)
-                    for engagement_attempt in range(MAX_RETRIES):
-                        try:
-                            self.poll_model.update_poll_engagement(poll_id, "vote")
-                            break  # Success, exit loop
-                        except WriteConcernError:
-                            print(f"⚠️ Engagement Write Conflict (Attempt {engagement_attempt + 1}) - Retrying...")
-                            time.sleep(0.1)  # Small delay before retry
-                    else:
-                        print("❌ Max retries reached for engagement update. Poll engagement may be inconsistent.")
+                    # Counter mode folds engagementMetrics.votes into the batched flush
+                    if VOTE_MODE != "counter":
+                        for engagement_attempt in range(MAX_RETRIES):
+                            try:
+                                self.poll_model.update_poll_engagement(poll_id, "vote")
+                                self.poll_model.record_trending(poll_id, "vote")
+                                break  # Success, exit loop
+                            except WriteConcernError:
+                                print(f"⚠️ Engagement Write Conflict (Attempt {engagement_attempt + 1}) - Retrying...")
+                                time.sleep(0.1)  # Small delay before retry
+                        else:
+                            print("❌ Max retries reached for engagement update. Poll engagement may be inconsistent.")
 
                     # ✅ Payment Handling
                     requires_payment, amount = self.payment_model.check_if_payment_required(poll_id, "voting")
@@ -256,6 +276,9 @@ class PollController:
                     print(f"⚠️ Write Conflict (Attempt {attempt + 1}) - Retrying...")
                     time.sleep(0.1)  # Small delay before retry
 
+                except ValueError as ve:
+                    return jsonify({"success": False, "message": str(ve)}), 400
+
                 except PyMongoError as e:
                     print(f"❌ Database Error: {e}")
                     return jsonify({"success": False, "message": "Failed to add vote. Please try again."}), 500
@@ -267,13 +290,11 @@ class PollController:
         return jsonify({"success": False, "message": "Failed after multiple attempts. Try again later."}), 500
     
     def emit_vote_update(self, poll_id, option_id):
-        from app import socketio
-        print(f"📢 Emitting vote_update: poll_id={poll_id}, vote={option_id}")
-        
+        """Queue the poll's tally for the next coalesced broadcast to its room."""
+        from app import vote_broadcaster
+
         try:
-            socketio.emit("vote_update", {"poll_id": poll_id, "vote": option_id})
-            socketio.sleep(0)  # 🔥 Forces instant emission
-            print("✅ Emission successful!")
+            vote_broadcaster.queue_vote(poll_id)
         except Exception as e:
             print(f"❌ Emission failed: {e}")
 
@@ -281,9 +302,11 @@ class PollController:
 
     def handle_get_poll(self, request, poll_id):
         try:
-            poll = self.poll_model.get_poll(poll_id)
-            poll["_id"] = str(poll["_id"])  # ✅ Convert ObjectId to string
-            return jsonify({"success": True, "data": str(poll)}), 200
+            view = request.args.get("view", "detail")
+            poll = self.poll_model.get_poll(poll_id, view=view)
+            return jsonify({"success": True, "data": poll}), 200
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
         except Exception as e:
             return jsonify({"success": False, "message": str(e)}), 500
 
@@ -291,7 +314,6 @@ class PollController:
         try:
             user_id,error=self.get_user_id_from_session()
             polls = self.poll_model.get_user_polls(user_id)
-            polls["_id"] = str(polls["_id"])  # ✅ Convert ObjectId to string
             return jsonify({"success": True, "data": polls}), 200
         except Exception as e:
             return jsonify({"success": False, "message": str(e)}), 500
@@ -310,15 +332,27 @@ class PollController:
 
     def handle_get_active_polls(self, request):
         try:
-            active_polls = self.poll_model.get_active_polls()
-            return jsonify({"success": True, "data": active_polls}), 200
+            page_size, cursor = parse_page_args(request.args)
+            view = request.args.get("view", "card")
+            active_polls, next_cursor = self.poll_model.get_active_polls(page_size, cursor, view)
+            return jsonify({"success": True, "data": active_polls, "next": next_cursor}), 200
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
         except Exception as e:
             return jsonify({"success": False, "message": str(e)}), 500
 
     def handle_get_polls_by_topic(self, request, topic):
         try:
-            polls = self.poll_model.get_polls_by_topic(topic)
-            return jsonify({"success": True, "data": polls}), 200
+            page_size, cursor = parse_page_args(request.args)
+            view = request.args.get("view", "card")
+            if request.args.get("sort") == "trending":
+                # Ranked by decayed engagement; a single page, so no cursor
+                polls = self.poll_model.get_trending_polls(page_size, topic, view)
+                return jsonify({"success": True, "data": polls, "next": None}), 200
+            polls, next_cursor = self.poll_model.get_polls_by_topic(topic, page_size, cursor, view)
+            return jsonify({"success": True, "data": polls, "next": next_cursor}), 200
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
         except Exception as e:
             return jsonify({"success": False, "message": str(e)}), 500
         
@@ -163,7 +163,7 @@ def session_required(f):
 
 from functools import wraps
 from flask import request, session, jsonify
-from utils.redis_session import get_session, is_session_valid
+from utils.redis_session import get_session
 
 def session_required(f):
     @wraps(f)
@@ -172,14 +172,13 @@ def session_required(f):
         session_id = request.cookies.get('session_id')
         #print('Session Id in session required decorator:', session_id)
 
-        # If there's no session_id or session is invalid
-        if not session_id or not is_session_valid(session_id):
+        if not session_id:
             return jsonify({"error": "Unauthorized. Session not valid or missing"}), 401
 
-        # Fetch session data from Redis (session contains user_id and token)
+        # A single lookup both validates and loads the session (cached in-process)
         redis_session_data = get_session(session_id)
         if not redis_session_data:
-            return jsonify({"error": "Unauthorized. Session data not found in Redis"}), 401
+            return jsonify({"error": "Unauthorized. Session not valid or missing"}), 401
 
         # Only store user_id and token in Flask session
         session.clear()  # Clear any previous session data in Flask
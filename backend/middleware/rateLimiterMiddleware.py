@@ -1,21 +1,145 @@
 from utils.db import RedisClient
+from utils.redis_session import get_session
 from flask import request, jsonify
 from functools import wraps
+from collections import OrderedDict
+import os
+import threading
+import time
+import uuid
 
-def apply_rate_limit(key, limit=10, window=30):
-    redis_client = RedisClient().get_client()
-    current_count = redis_client.incr(key)
-    if current_count == 1:
-        redis_client.expire(key, window)
-    return current_count <= limit
+DEFAULT_LIMIT = int(os.getenv("RATE_LIMIT_DEFAULT", 10))
+DEFAULT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", 30))  # Seconds
+DEFAULT_ALGORITHM = os.getenv("RATE_LIMIT_ALGORITHM", "sliding_window")  # or "token_bucket"
+# Share of each limit a worker may serve from its in-process bucket without
+# touching Redis (0 disables the fast path). With N workers a client can exceed
+# the limit by at most (N - 1) * share * limit per window.
+LOCAL_FAST_PATH_SHARE = float(os.getenv("RATE_LIMIT_LOCAL_SHARE", 0.25))
+LOCAL_MAX_KEYS = int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", 10000))
 
+# Sliding log: drop entries older than the window, then admit if under the limit.
+SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+local count = redis.call('ZCARD', key)
+local allowed = 0
+if count < limit then
+    redis.call('ZADD', key, now, ARGV[4])
+    allowed = 1
+end
+redis.call('PEXPIRE', key, window)
+return allowed
+"""
 
-def rate_limit(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        user_ip = request.remote_addr
-        if not apply_rate_limit(f"rate_limit:{user_ip}"):
-            return jsonify({"message": "Too many requests, please try again later."}), 429
-        return f(*args, **kwargs)
+# Token bucket: refill by elapsed time, then take one token if available.
+TOKEN_BUCKET_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+local rate = capacity / window
+local state = redis.call('HMGET', key, 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', key, window)
+return allowed
+"""
 
-    return decorated_function
+_scripts = {}
+
+
+def _get_script(algorithm):
+    """Register each Lua script once; redis-py then calls it via EVALSHA."""
+    if algorithm not in _scripts:
+        source = TOKEN_BUCKET_LUA if algorithm == "token_bucket" else SLIDING_WINDOW_LUA
+        _scripts[algorithm] = RedisClient().get_client().register_script(source)
+    return _scripts[algorithm]
+
+
+class LocalTokenBuckets:
+    """Bounded in-process token buckets used to skip Redis for light clients."""
+
+    def __init__(self, max_keys=LOCAL_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # {key: [tokens, last_refill]}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key, capacity, window):
+        if capacity < 1:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(key, None) or [capacity, now]
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * capacity / window)
+            bucket[1] = now
+            allowed = bucket[0] >= 1
+            if allowed:
+                bucket[0] -= 1
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)  # Evict least recently used
+        return allowed
+
+
+local_buckets = LocalTokenBuckets()
+
+
+def apply_rate_limit(key, limit=DEFAULT_LIMIT, window=DEFAULT_WINDOW, algorithm=DEFAULT_ALGORITHM):
+    """Return True if the request is within limits; one Lua call when Redis is needed."""
+    local_capacity = int(limit * LOCAL_FAST_PATH_SHARE)
+    if local_capacity and local_buckets.try_acquire(key, local_capacity, window):
+        return True
+
+    now_ms = int(time.time() * 1000)
+    args = [now_ms, window * 1000, limit - local_capacity]
+    if algorithm != "token_bucket":
+        args.append(f"{now_ms}-{uuid.uuid4().hex}")
+    try:
+        return bool(_get_script(algorithm)(keys=[key], args=args))
+    except Exception as e:
+        print(f"❌ Rate limiter unavailable, allowing request: {e}")
+        return True
+
+
+def _client_identity():
+    """Key clients by user when the session is valid, falling back to IP."""
+    session_id = request.cookies.get("session_id")
+    if session_id:
+        try:
+            session_data = get_session(session_id)
+        except Exception as e:
+            print(f"⚠️ Session lookup failed, rate limiting by IP: {e}")
+            session_data = None
+        # A made-up or expired cookie must not buy a fresh bucket
+        user_id = (session_data or {}).get("user_id")
+        if user_id:
+            return f"user:{user_id}"
+    return f"ip:{request.remote_addr}"
+
+
+def rate_limit(f=None, *, limit=DEFAULT_LIMIT, window=DEFAULT_WINDOW, algorithm=DEFAULT_ALGORITHM):
+    """
+    Per-route, per-client rate limit. Use as @rate_limit or
+    @rate_limit(limit=100, window=60, algorithm="token_bucket").
+    """
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            key = f"rate_limit:{request.endpoint}:{_client_identity()}"
+            if not apply_rate_limit(key, limit, window, algorithm):
+                return jsonify({"message": "Too many requests, please try again later."}), 429
+            return func(*args, **kwargs)
+
+        return decorated_function
+
+    return decorator(f) if f else decorator
@@ -0,0 +1,12 @@
+"""
+Convert Poll.expiresAt from ISO strings to BSON dates.
+
+    python -m migrations.expires_at_to_date
+
+Safe to re-run: only polls whose expiresAt is still a string are touched.
+"""
+from models.Poll import Poll
+
+if __name__ == "__main__":
+    modified = Poll().migrate_expires_at_to_date()
+    print(f"✅ Converted expiresAt to a date on {modified} polls")
@@ -0,0 +1,14 @@
+"""
+Backfill the votes collection from the legacy users.votesCast arrays.
+
+    python -m migrations.votes_cast_to_votes
+
+Run after deploying the votes collection and before relying on has_user_voted
+for existing users. Safe to re-run: votes are upserted on the unique
+(pollId, userId) key, so existing entries are never duplicated or overwritten.
+"""
+from models.User import User
+
+if __name__ == "__main__":
+    inserted = User().migrate_votes_cast_to_votes()
+    print(f"✅ Copied {inserted} votes from votesCast into the votes collection")
@@ -1,10 +1,12 @@
 from bson import ObjectId
 from datetime import datetime, timezone
+from pymongo import UpdateOne
 from pymongo.errors import PyMongoError
 from flask import jsonify
 
 # Importing db_instance class from db.py
 from utils.db import db_instance
+from utils.pagination import paginate
 
 def generate_objectid():
     """Generate a new ObjectId."""
@@ -14,16 +16,6 @@ def generate_objectid():
         print(f"Error generating ObjectId: {e}")
         raise
 
-def serialize_comment(comment):
-    """Convert MongoDB comment document to a JSON-serializable format."""
-    if comment and "_id" in comment:
-        comment["_id"] = str(comment["_id"])
-        comment["pollId"] = str(comment["pollId"])
-        comment["userId"] = str(comment["userId"])
-        if "parentId" in comment and comment["parentId"]:
-            comment["parentId"] = str(comment["parentId"])
-    return comment
-
 class Comment:
     def __init__(self):
         self.collection = db_instance.get_collection("comments")
@@ -49,17 +41,16 @@ class Comment:
     def get_comment_by_id(self, comment_id):
         """Fetch a comment by its ObjectId."""
         try:
-            comment = self.collection.find_one({"_id": ObjectId(comment_id)})
-            return serialize_comment(comment) if comment else None
+            return self.collection.find_one({"_id": ObjectId(comment_id)})
         except PyMongoError as e:
             print(f"Error fetching comment by ID: {e}")
             raise
 
-    def get_comments_by_poll(self, poll_id):
-        """Retrieve all comments for a given poll, including nested comments."""
+    def get_comments_by_poll(self, poll_id, page_size=None, cursor=None):
+        """Retrieve a page of comments for a given poll, including nested comments, newest first."""
         try:
-            comments = list(self.collection.find({"pollId": ObjectId(poll_id)}))
-            return [serialize_comment(comment) for comment in comments]
+            return paginate(self.collection, {"pollId": ObjectId(poll_id)},
+                            page_size=page_size, cursor=cursor)
         except PyMongoError as e:
             print(f"Error fetching comments for poll: {e}")
             raise
@@ -68,7 +59,7 @@ class Comment:
         """Retrieve all comments made by a specific user."""
         try:
             comments = list(self.collection.find({"userId": str(user_id)}))
-            return [serialize_comment(comment) for comment in comments]
+            return comments
         except PyMongoError as e:
             print(f"Error fetching comments by user: {e}")
             raise'''
@@ -76,8 +67,7 @@ class Comment:
     def get_replies(self, parent_id):
         """Retrieve all replies to a given parent comment."""
         try:
-            comments = list(self.collection.find({"parentId": ObjectId(parent_id)}))
-            return [serialize_comment(comment) for comment in comments]
+            return list(self.collection.find({"parentId": ObjectId(parent_id)}))
         except PyMongoError as e:
             print(f"Error fetching replies: {e}")
             raise
@@ -94,6 +84,23 @@ class Comment:
             print(f"Error updating comment sentiment: {e}")
             raise
 
+    def bulk_update_comment_sentiments(self, sentiments):
+        """Write many (comment_id, sentiment_score, sentiment_label) results in one bulk_write."""
+        try:
+            operations = [
+                UpdateOne(
+                    {"_id": ObjectId(comment_id)},
+                    {"$set": {"sentimentScore": sentiment_score, "sentimentLabel": sentiment_label}}
+                )
+                for comment_id, sentiment_score, sentiment_label in sentiments
+            ]
+            if not operations:
+                return 0
+            return self.collection.bulk_write(operations, ordered=False).modified_count
+        except PyMongoError as e:
+            print(f"Error updating comment sentiments: {e}")
+            raise
+
     def delete_comment(self, comment_id):
         """Delete a comment by its ObjectId."""
         try:
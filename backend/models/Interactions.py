@@ -4,6 +4,7 @@ from pymongo.errors import PyMongoError
 
 # Importing db_instance class from db.py
 from utils.db import db_instance
+from utils.pagination import paginate
 
 def generate_objectid():
     """Generate a new ObjectId."""
@@ -13,14 +14,6 @@ def generate_objectid():
         print(f"Error generating ObjectId: {e}")
         raise
 
-def serialize_interaction(interaction):
-    """Convert MongoDB interaction document to a JSON-serializable format."""
-    if interaction and "_id" in interaction:
-        interaction["_id"] = str(interaction["_id"])
-        interaction["userId"] = str(interaction["userId"])
-        interaction["pollId"] = str(interaction["pollId"])
-    return interaction
-
 class Interaction:
     def __init__(self):
         self.collection = db_instance.get_collection("interactions")
@@ -41,29 +34,29 @@ class Interaction:
             print(f"Error logging interaction: {e}")
             raise
 
-    def get_interactions_by_user(self, user_id):
-        """Retrieve all interactions for a specific user."""
+    def get_interactions_by_user(self, user_id, page_size=None, cursor=None):
+        """Retrieve a page of interactions for a specific user, newest first."""
         try:
-            interactions = list(self.collection.find({"userId": str(user_id)}))
-            return [serialize_interaction(interaction) for interaction in interactions]
+            return paginate(self.collection, {"userId": str(user_id)}, sort_field="timestamp",
+                            page_size=page_size, cursor=cursor)
         except PyMongoError as e:
             print(f"Error fetching interactions by user: {e}")
             raise
 
-    def get_interactions_by_poll(self, poll_id):
-        """Retrieve all interactions for a specific poll."""
+    def get_interactions_by_poll(self, poll_id, page_size=None, cursor=None):
+        """Retrieve a page of interactions for a specific poll, newest first."""
         try:
-            interactions = list(self.collection.find({"pollId": str(poll_id)}))
-            return [serialize_interaction(interaction) for interaction in interactions]
+            return paginate(self.collection, {"pollId": str(poll_id)}, sort_field="timestamp",
+                            page_size=page_size, cursor=cursor)
         except PyMongoError as e:
             print(f"Error fetching interactions by poll: {e}")
             raise
 
-    def get_interactions_by_type(self, action_type):
-        """Retrieve all interactions of a specific type (e.g., 'view', 'click')."""
+    def get_interactions_by_type(self, action_type, page_size=None, cursor=None):
+        """Retrieve a page of interactions of a specific type (e.g., 'view', 'click'), newest first."""
         try:
-            interactions = list(self.collection.find({"actionType": action_type}))
-            return [serialize_interaction(interaction) for interaction in interactions]
+            return paginate(self.collection, {"actionType": action_type}, sort_field="timestamp",
+                            page_size=page_size, cursor=cursor)
         except PyMongoError as e:
             print(f"Error fetching interactions by type: {e}")
             raise
@@ -5,6 +5,7 @@ from pymongo.errors import PyMongoError
 
 # Importing db_instance class from db.py
 from utils.db import db_instance
+from utils.pagination import paginate
 
 def generate_objectid():
     """Generate a new ObjectId."""
@@ -58,19 +59,21 @@ class Notification:
             raise
 
 
-    def get_notifications_by_user(self, user_id, status=None):
+    def get_notifications_by_user(self, user_id, status=None, page_size=None, cursor=None):
         """
-        Retrieve notifications for a specific user, optionally filtering by status.
+        Retrieve a page of notifications for a specific user, newest first, optionally filtering by status.
 
         :param user_id: ID of the user
         :param status: Optional filter for notification status
-        :return: List of notifications
+        :param page_size: Maximum number of notifications to return
+        :param cursor: Token from the previous page, if any
+        :return: (list of notifications, next page cursor or None)
         """
         try:
             query = {"userId": str(user_id)}
             if status:
                 query["status"] = status
-            return list(self.collection.find(query))
+            return paginate(self.collection, query, page_size=page_size, cursor=cursor)
         except PyMongoError as e:
             print(f"Error fetching notifications: {e}")
             raise
@@ -5,6 +5,7 @@ from pymongo.errors import PyMongoError
 
 # Importing db_instance class from db.py
 from utils.db import db_instance
+from utils.pagination import paginate
 
 def generate_objectid():
     """Generate a new ObjectId."""
@@ -38,18 +39,18 @@ class Payment:
             print(f"Error creating payment: {e}")
             raise
 
-    def get_payments_by_user(self, user_id):
-        """Fetch all payments made by a user."""
+    def get_payments_by_user(self, user_id, page_size=None, cursor=None):
+        """Fetch a page of payments made by a user, newest first."""
         try:
-            return list(self.collection.find({"userId": str(user_id)}))
+            return paginate(self.collection, {"userId": str(user_id)}, page_size=page_size, cursor=cursor)
         except PyMongoError as e:
             print(f"Error fetching payments by user: {e}")
             raise
 
-    def get_payments_for_poll(self, poll_id):
-        """Fetch all payments made for a specific poll."""
+    def get_payments_for_poll(self, poll_id, page_size=None, cursor=None):
+        """Fetch a page of payments made for a specific poll, newest first."""
         try:
-            return list(self.collection.find({"pollId": str(poll_id)}))
+            return paginate(self.collection, {"pollId": str(poll_id)}, page_size=page_size, cursor=cursor)
         except PyMongoError as e:
             print(f"Error fetching payments for poll: {e}")
             raise
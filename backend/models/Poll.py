@@ -3,10 +3,22 @@ from bson import ObjectId
 from datetime import datetime
 from pymongo.errors import PyMongoError
 from datetime import datetime, timezone
+import os
 
 
 # Importing db_instance class from db.py
 from utils.db import db_instance
+from utils.pagination import paginate
+from utils import poll_cache, trending, active_polls
+from utils.feature_extraction import get_feature_vector, idf_model
+
+# "classic" keeps the read-check-write vote path; "atomic" folds every vote
+# check into the update filter so a vote costs a single Mongo write;
+# "counter" lands votes in sharded Redis counters flushed to Mongo in batches.
+VOTE_MODE = os.getenv("POLL_VOTE_MODE", "classic")
+
+if VOTE_MODE == "counter":
+    from utils import vote_counter
 
 def generate_objectid():
     """Generate a new ObjectId."""
@@ -16,26 +28,96 @@ def generate_objectid():
         print(f"Error generating ObjectId: {e}")
         raise
 
-def serialize_poll(poll):
-    """Convert MongoDB poll document into a JSON-serializable format."""
-    if not poll:
+def serialize_poll_tally(poll):
+    """Shape a poll for live result displays: vote counts only."""
+    return {
+        "_id": poll["_id"],
+        "options": [{"optionId": o["optionId"], "voteCount": o.get("voteCount", 0)} for o in poll.get("options", [])],
+        "totalVotes": poll.get("totalVotes", 0),
+        "currentVotes": poll.get("currentVotes", 0),
+        "requiredVotes": poll.get("requiredVotes"),
+        "isActive": poll.get("isActive", False),
+    }
+
+
+def serialize_poll_card(poll):
+    """Shape a poll for feed cards."""
+    return {
+        "_id": poll["_id"],
+        "title": poll.get("title"),
+        "topics": poll.get("topics", []),
+        "options": [{"optionId": o["optionId"], "optionText": o.get("optionText"), "voteCount": o.get("voteCount", 0)}
+                    for o in poll.get("options", [])],
+        "totalVotes": poll.get("totalVotes", 0),
+        "isActive": poll.get("isActive", False),
+        "createdAt": poll.get("createdAt"),
+        "expiresAt": poll.get("expiresAt"),
+        "commentCount": poll.get("engagementMetrics", {}).get("comments", 0),
+    }
+
+
+def serialize_poll_detail(poll):
+    """Shape a poll for its own page: the card plus description, ownership, progress and voting cost."""
+    detail = serialize_poll_card(poll)
+    detail.update({
+        "description": poll.get("description"),
+        "createdBy": poll.get("createdBy"),
+        "visibility": poll.get("visibility"),
+        "currentVotes": poll.get("currentVotes", 0),
+        "requiredVotes": poll.get("requiredVotes"),
+        "sentimentLabel": poll.get("sentimentLabel"),
+        "sentimentScore": poll.get("sentimentScore"),
+        "engagementMetrics": poll.get("engagementMetrics", {}),
+        "requiresPaymentForVoting": poll.get("requires_payment_for_voting", False),
+        "paymentAmountForVoting": poll.get("payment_amount_for_voting", 0),
+    })
+    return detail
+
+
+# Named read views: {view: (projection, serializer)}. Projections never include the
+# unbounded `comments` array or `featureVector`, so a response costs the same bytes
+# whatever the poll's size.
+_CARD_FIELDS = ["title", "topics", "options.optionId", "options.optionText", "options.voteCount",
+                "totalVotes", "isActive", "createdAt", "expiresAt", "engagementMetrics.comments"]
+_TALLY_FIELDS = ["options.optionId", "options.voteCount", "totalVotes", "currentVotes", "requiredVotes", "isActive"]
+_DETAIL_FIELDS = [field for field in _CARD_FIELDS if field != "engagementMetrics.comments"] + [
+    "description", "createdBy", "visibility", "currentVotes", "requiredVotes", "sentimentLabel",
+    "sentimentScore", "engagementMetrics", "requires_payment_for_voting", "payment_amount_for_voting"]
+
+POLL_VIEWS = {
+    "card": ({field: 1 for field in _CARD_FIELDS}, serialize_poll_card),
+    "detail": ({field: 1 for field in _DETAIL_FIELDS}, serialize_poll_detail),
+    "tally": ({field: 1 for field in _TALLY_FIELDS}, serialize_poll_tally),
+}
+
+
+def is_open(poll):
+    """Whether a poll belongs in public feeds: public, active and not yet expired."""
+    expires_at = parse_expires_at(poll.get("expiresAt"))
+    return (poll.get("visibility") == "public" and poll.get("isActive", False)
+            and expires_at is not None and expires_at > datetime.now(timezone.utc))
+
+
+INTERNAL_POLL_PROJECTION = {"comments": 0, "featureVector": 0}
+INDEXED_POLL_PROJECTION = {"featureVector": 1, "visibility": 1, "isActive": 1, "expiresAt": 1}
+
+
+def get_poll_view(view):
+    """Return the (projection, serializer) pair for a named view. Raises ValueError for unknown views."""
+    if view not in POLL_VIEWS:
+        raise ValueError(f"Unknown poll view '{view}'. Expected one of: {', '.join(POLL_VIEWS)}")
+    return POLL_VIEWS[view]
+
+
+def parse_expires_at(expires_at):
+    """Normalise an expiry (ISO string or datetime) to a timezone-aware UTC datetime."""
+    if not expires_at:
         return None
-
-    # Convert _id field
-    if "_id" in poll:
-        poll["_id"] = str(poll["_id"])
-
-    # Convert ObjectId fields
-    fields_to_convert = ["comments"]
-
-    for field in fields_to_convert:
-        if field in poll:
-            if isinstance(poll[field], ObjectId):
-                poll[field] = str(poll[field])
-            elif isinstance(poll[field], list):  # Convert list of ObjectIds
-                poll[field] = [str(obj_id) for obj_id in poll[field] if isinstance(obj_id, ObjectId)]
-
-    return poll
+    if isinstance(expires_at, str):
+        expires_at = datetime.fromisoformat(expires_at.replace("Z", "+00:00"))
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at.astimezone(timezone.utc)
 
 
 class Poll:
@@ -58,7 +140,7 @@ class Poll:
                 "options": [{"optionId": i, "optionText": opt, "voteCount": 0} for i, opt in enumerate(options)],
                 "createdBy": str(created_by),
                 "createdAt": datetime.now(timezone.utc),
-                "expiresAt": expires_at,
+                "expiresAt": parse_expires_at(expires_at),  # Stored as a BSON date so it can be range-scanned
                 "visibility": visibility,
                 "totalVotes": 0,
                 "requiredVotes": required_votes,
@@ -83,8 +165,12 @@ class Poll:
                 },
                 "featureVector": None  # Store embeddings for CBF (TF-IDF, BERT, etc.)
             }
+            poll["featureVector"] = get_feature_vector(poll)  # Fixed-width hashed term counts
 
             result = self.collection.insert_one(poll,session=session)
+            if session is None:
+                self.on_poll_created(result.inserted_id, poll)
+            # Inside a transaction the caller runs on_poll_created after the commit
             return result.inserted_id
         except PyMongoError as e:
             print(f"Error creating poll: {e}")
@@ -109,27 +195,64 @@ class Poll:
                 updates["requires_payment_for_update"] = requires_payment_for_update
                 updates["payment_amount_for_update"] = payment_amount_for_update
 
-            return self.collection.update_one(
+            if "expiresAt" in updates:
+                updates["expiresAt"] = parse_expires_at(updates["expiresAt"])
+
+            # Keep the stored CBF vector in step with the poll's text
+            if any(field in updates for field in ("title", "description", "topics")):
+                updates["featureVector"] = get_feature_vector({**poll, **updates})
+
+            result = self.collection.update_one(
                 {"_id": ObjectId(poll_id)},
                 {"$set": updates}
             ,session=session)
+            poll_cache.invalidate(poll_id)
+            if session is None:
+                self.on_poll_updated(poll_id, {**poll, **updates})
+            # Inside a transaction the caller runs on_poll_updated after the commit
+            return result
         except PyMongoError as e:
             print(f"Error updating poll details: {e}")
             raise
 
+    def on_poll_created(self, poll_id, poll=None):
+        """
+        Side effects of a committed create_poll: fold its vector into the IDF and
+        add it to the active poll set. Loads the poll when it is not passed in.
+        """
+        poll = poll or self.collection.find_one({"_id": ObjectId(poll_id)}, INDEXED_POLL_PROJECTION)
+        if not poll:
+            return
+        idf_model.partial_fit(poll.get("featureVector"))
+        if is_open(poll):
+            active_polls.add(poll_id)
+
+    def on_poll_updated(self, poll_id, poll=None):
+        """
+        Side effects of a committed update_poll: drop cached views and bring the
+        poll's active set membership in line. Loads the poll when it is not passed in.
+        """
+        poll_cache.invalidate(poll_id)
+        poll = poll or self.collection.find_one({"_id": ObjectId(poll_id)}, INDEXED_POLL_PROJECTION)
+        if poll and is_open(poll):
+            active_polls.add(poll_id)
+        else:
+            active_polls.remove(poll_id)
+
     def add_vote(self, poll_id, option_id, user_id,session=None):
         """Add a vote to a poll, checking if payment is required."""
+        if VOTE_MODE == "atomic":
+            return self.add_vote_atomic(poll_id, option_id, user_id, session)
+        if VOTE_MODE == "counter":
+            return self.add_vote_counted(poll_id, option_id, user_id)
         try:
             poll = self.collection.find_one({"_id": ObjectId(poll_id)})
             if not poll:
                 raise ValueError("Poll not found.")
             
             # Check if the poll has expired
-            expires_at = poll.get("expiresAt")
+            expires_at = parse_expires_at(poll.get("expiresAt"))
             if expires_at:
-                expires_at = datetime.fromisoformat(expires_at)
-                if expires_at.tzinfo is None:
-                    expires_at = expires_at.replace(tzinfo=timezone.utc)
                 if datetime.now(timezone.utc) > expires_at:
                     raise ValueError("The poll has expired.")
 
@@ -150,17 +273,126 @@ class Poll:
                     {"_id": ObjectId(poll_id)},
                     {"$set": {"isActive": False}}
                 ,session=session)
+            poll_cache.invalidate(poll_id)
         except PyMongoError as e:
             print(f"Error adding vote: {e}")
             raise
 
-    def get_poll(self, poll_id):
-        """Retrieve a poll by ID."""
+    def add_vote_atomic(self, poll_id, option_id, user_id, session=None):
+        """
+        Add a vote in exactly one round trip.
+
+        The expiry, active flag, vote limit and option checks all live in the
+        update filter, and a pipeline update bumps the counters and closes the
+        poll once the limit is reached, so concurrent voters cannot overshoot
+        requiredVotes.
+        """
         try:
-            poll = self.collection.find_one({"_id": ObjectId(poll_id)})
+            now = datetime.now(timezone.utc)
+            vote_filter = {
+                "_id": ObjectId(poll_id),
+                "isActive": True,
+                "options.optionId": option_id,
+                "$expr": {
+                    "$and": [
+                        {"$lt": ["$currentVotes", "$requiredVotes"]},
+                        {"$or": [
+                            {"$eq": [{"$ifNull": ["$expiresAt", None]}, None]},
+                            {"$gt": [{"$toDate": "$expiresAt"}, now]}
+                        ]}
+                    ]
+                }
+            }
+            vote_pipeline = [
+                {"$set": {
+                    "options": {
+                        "$map": {
+                            "input": "$options",
+                            "as": "opt",
+                            "in": {
+                                "$cond": [
+                                    {"$eq": ["$$opt.optionId", option_id]},
+                                    {"$mergeObjects": ["$$opt", {"voteCount": {"$add": ["$$opt.voteCount", 1]}}]},
+                                    "$$opt"
+                                ]
+                            }
+                        }
+                    },
+                    "totalVotes": {"$add": ["$totalVotes", 1]},
+                    "currentVotes": {"$add": ["$currentVotes", 1]}
+                }},
+                {"$set": {"isActive": {"$lt": ["$currentVotes", "$requiredVotes"]}}}
+            ]
+
+            result = self.collection.update_one(vote_filter, vote_pipeline, session=session)
+            if result.matched_count == 0:
+                raise ValueError("Poll not found, closed, expired or option invalid.")
+            poll_cache.invalidate(poll_id)
+        except PyMongoError as e:
+            print(f"Error adding vote: {e}")
+            raise
+
+    def add_vote_counted(self, poll_id, option_id, user_id):
+        """
+        Validate a vote for counter mode without counting it yet. Returns a
+        ticket (requiredVotes, currentVotes, flushed counter at read time) to be
+        passed to record_counted_vote once the caller's transaction commits.
+        """
+        try:
+            flushed_before = vote_counter.get_flushed_count(poll_id)  # Must precede the Mongo read
+            poll = self.collection.find_one(
+                {"_id": ObjectId(poll_id)},
+                {"options.optionId": 1, "expiresAt": 1, "isActive": 1, "currentVotes": 1, "requiredVotes": 1}
+            )
             if not poll:
                 raise ValueError("Poll not found.")
-            return serialize_poll(poll)
+            if not poll.get("isActive", False):
+                raise ValueError("Voting is closed for this poll.")
+
+            expires_at = parse_expires_at(poll.get("expiresAt"))
+            if expires_at:
+                if datetime.now(timezone.utc) > expires_at:
+                    raise ValueError("The poll has expired.")
+
+            if not any(opt.get("optionId") == option_id for opt in poll.get("options", [])):
+                raise ValueError("Poll or Option not found.")
+
+            return poll.get("requiredVotes", 0), poll.get("currentVotes", 0), flushed_before
+        except PyMongoError as e:
+            print(f"Error adding vote: {e}")
+            raise
+
+    def record_counted_vote(self, poll_id, option_id, ticket):
+        """
+        Count a committed vote in the poll's sharded Redis counters.
+        The vote limit is checked inside the same Redis script that counts the
+        vote; VoteCounterFlusher folds the counters into Mongo.
+        """
+        required_votes, current_votes, flushed_before = ticket
+        if not vote_counter.record_vote(poll_id, option_id, required_votes, current_votes, flushed_before):
+            raise ValueError("Voting is closed for this poll.")
+        self.record_trending(poll_id, "vote")
+
+    def get_poll(self, poll_id, view=None):
+        """
+        Retrieve a poll by ID through the Redis poll cache. With a view name ("card",
+        "detail", "tally") only that view's fields are read and the slim shape is
+        returned; without one the whole document minus `comments` and `featureVector`
+        is returned for internal use. Cached ids and dates come back as strings.
+        """
+        try:
+            projection, serializer = get_poll_view(view) if view else (INTERNAL_POLL_PROJECTION, None)
+
+            def load():
+                poll = self.collection.find_one({"_id": ObjectId(poll_id)}, projection)
+                return serializer(poll) if poll and serializer else poll
+
+            poll = poll_cache.get_or_load(poll_id, view or "internal", load)
+            if not poll:
+                raise ValueError("Poll not found.")
+            if VOTE_MODE == "counter":  # Unflushed votes are never cached
+                poll = vote_counter.merge_pending_counts(poll)
+            return poll
         except PyMongoError as e:
             print(f"Error fetching poll: {e}")
             raise
@@ -168,10 +400,7 @@ class Poll:
     def get_user_polls(self, user_id):
         """Retrieve all polls created by a specific user."""
         try:
-            polls = list(self.collection.find({"createdBy": user_id}))
-            for poll in polls:
-                poll = serialize_poll(poll)
-            return polls
+            return list(self.collection.find({"createdBy": user_id}))
         except PyMongoError as e:
             print(f"Error fetching user's polls: {e}")
             raise
@@ -187,6 +416,9 @@ class Poll:
                 raise PermissionError("You are not authorized to delete this poll.")
 
             self.collection.delete_one({"_id": ObjectId(poll_id)})
+            poll_cache.invalidate(poll_id)
+            trending.remove_polls(poll_id)
+            active_polls.remove(poll_id)
             return True
         except PyMongoError as e:
             print(f"Error deleting poll: {e}")
@@ -208,57 +440,74 @@ class Poll:
                 {"_id": ObjectId(poll_id)},
                 {"$set": {"requiredVotes": new_vote_limit}}
             )
+            poll_cache.invalidate(poll_id)
             return True
         except PyMongoError as e:
             print(f"Error extending poll votes: {e}")
             raise
 
+    def migrate_expires_at_to_date(self):
+        """Convert legacy string expiresAt values to BSON dates in one server-side update."""
+        try:
+            result = self.collection.update_many(
+                {"expiresAt": {"$type": "string"}},
+                [{"$set": {"expiresAt": {"$toDate": "$expiresAt"}}}]
+            )
+            return result.modified_count
+        except PyMongoError as e:
+            print(f"Error migrating poll expiry dates: {e}")
+            raise
+
     def close_expired_polls(self):
         """Automatically close polls that have expired."""
         try:
             now = datetime.now(timezone.utc)
+            expired = {"expiresAt": {"$lt": now}, "isActive": True}
+            # Collect ids first so exactly the closed polls drop out of the cache
+            poll_ids = [poll["_id"] for poll in self.collection.find(expired, {"_id": 1})]
+            if not poll_ids:
+                return 0
             result = self.collection.update_many(
-                {"expiresAt": {"$lt": now}, "isActive": True},
+                {**expired, "_id": {"$in": poll_ids}},
                 {"$set": {"isActive": False}}
             )
+            poll_cache.invalidate(*poll_ids)
+            trending.remove_polls(*poll_ids)
+            active_polls.remove(*poll_ids)
             return result.modified_count
         except PyMongoError as e:
             print(f"Error closing expired polls: {e}")
             raise
 
-    def get_active_polls(self):
-        """Retrieve all active, non-expired, and public polls."""
+    def get_active_polls(self, page_size=None, cursor=None, view="card"):
+        """Retrieve a page of active, non-expired, and public polls, newest first, in the given view."""
         try:
+            projection, serializer = get_poll_view(view)
             now = datetime.now(timezone.utc)
-            polls = list(self.collection.find({
+            # Served by the (visibility, isActive, createdAt, expiresAt) index
+            polls, next_cursor = paginate(self.collection, {
+                "visibility": "public",
                 "isActive": True,
-                "$expr": {"$gt": [{"$dateFromString": {"dateString": "$expiresAt"}}, now]},
-                "visibility": "public"
-            }))
-            # Convert ObjectId to string for JSON serialization
-            for poll in polls:
-                poll["_id"] = str(poll["_id"])
-                poll = serialize_poll(poll)
-            return polls
+                "expiresAt": {"$gt": now}
+            }, page_size=page_size, cursor=cursor, projection=projection)
+            return [serializer(poll) for poll in polls], next_cursor
         except PyMongoError as e:
             print(f"Error fetching active polls: {e}")
             raise
 
-    def get_polls_by_topic(self, topic):
-        """Retrieve all active polls under a specific topic."""
+    def get_polls_by_topic(self, topic, page_size=None, cursor=None, view="card"):
+        """Retrieve a page of active polls under a specific topic, newest first, in the given view."""
         try:
+            projection, serializer = get_poll_view(view)
             now = datetime.now(timezone.utc)
-            polls = list(self.collection.find({
+            # Served by the (topics, visibility, isActive, createdAt, expiresAt) index
+            polls, next_cursor = paginate(self.collection, {
                 "topics": topic,
+                "visibility": "public",
                 "isActive": True,
-                "$expr": {"$gt": [{"$dateFromString": {"dateString": "$expiresAt"}}, now]},
-                "visibility": "public"
-            }))
-            # Convert ObjectId to string for JSON serialization
-            for poll in polls:
-                poll["_id"] = str(poll["_id"])
-                poll = serialize_poll(poll)
-            return polls
+                "expiresAt": {"$gt": now}
+            }, page_size=page_size, cursor=cursor, projection=projection)
+            return [serializer(poll) for poll in polls], next_cursor
         except PyMongoError as e:
             print(f"Error fetching polls by topic: {e}")
             raise
@@ -279,7 +528,10 @@ class Poll:
 
 
     def update_poll_engagement(self, poll_id, action_type, session=None):
-        """Update poll engagement ensuring mutual exclusivity between likes, dislikes, and neutral resets."""
+        """
+        Update poll engagement ensuring mutual exclusivity between likes, dislikes, and neutral resets.
+        Callers feed trending with record_trending once their transaction has committed.
+        """
         try:
             engagement_fields = {
                 "view": "engagementMetrics.views",
@@ -310,17 +562,55 @@ class Poll:
 
             if result.modified_count == 0:
                 raise ValueError("Poll not found or engagement not updated.")
+            poll_cache.invalidate(poll_id)
 
         except PyMongoError as e:
             print(f"Error updating poll engagement: {e}")
             raise
 
+    def record_trending(self, poll_id, action_type):
+        """Add a committed engagement event to the poll's trending score(s)."""
+        trending.record_engagement(poll_id, action_type, self.get_trending_topics(poll_id))
+
+    def get_trending_topics(self, poll_id):
+        """Topics whose trending sets a poll's events feed (none unless TRENDING_BY_TOPIC is on)."""
+        if not trending.TRENDING_BY_TOPIC:
+            return []
+        try:
+            return self.get_poll(poll_id, view="card").get("topics", [])
+        except ValueError:
+            return []
+
+    def filter_open_public(self, poll_ids):
+        """Keep the ids of public, active, unexpired polls, in their original order."""
+        if not poll_ids:
+            return []
+        try:
+            query = {**active_polls.active_filter(), "_id": {"$in": [ObjectId(pid) for pid in poll_ids]}}
+            open_ids = {str(poll["_id"]) for poll in self.collection.find(query, {"_id": 1})}
+            return [pid for pid in poll_ids if str(pid) in open_ids]
+        except PyMongoError as e:
+            print(f"Error filtering open polls: {e}")
+            raise
+
+    def get_trending_polls(self, limit=10, topic=None, view="card"):
+        """Retrieve the top trending polls, optionally within a topic, in rank order."""
+        try:
+            projection, serializer = get_poll_view(view)
+            poll_ids = trending.get_trending(limit, topic)
+            # Sets can briefly hold private or closed polls until the maintainer prunes them
+            query = {**active_polls.active_filter(), "_id": {"$in": [ObjectId(pid) for pid in poll_ids]}}
+            polls = {str(poll["_id"]): poll for poll in self.collection.find(query, projection)}
+            return [serializer(polls[pid]) for pid in poll_ids if pid in polls]
+        except PyMongoError as e:
+            print(f"Error fetching trending polls: {e}")
+            raise
+
     def get_polls_sorted_by(self, field, descending=True, limit=3):
         """Fetches polls sorted by a specific field (e.g., engagement metrics)."""
         try:
             sort_order = -1 if descending else 1
-            polls = list(self.collection.find().sort(field, sort_order).limit(limit))
-            return [serialize_poll(poll) for poll in polls]
+            return list(self.collection.find().sort(field, sort_order).limit(limit))
         except PyMongoError as e:
             print(f"Error fetching sorted polls: {e}")
             raise
@@ -328,8 +618,7 @@ class Poll:
     def get_polls_filtered(self, filter_condition, limit=3):
         """Fetches polls based on a filter condition (e.g., recent polls)."""
         try:
-            polls = list(self.collection.find(filter_condition).sort("createdAt", -1).limit(limit))
-            return [serialize_poll(poll) for poll in polls]
+            return list(self.collection.find(filter_condition).sort("createdAt", -1).limit(limit))
         except PyMongoError as e:
             print(f"Error fetching filtered polls: {e}")
             raise
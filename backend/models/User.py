@@ -1,11 +1,14 @@
 #from pydantic import BaseModel
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime, timezone
+from pymongo import UpdateOne
 from pymongo.errors import PyMongoError
 from flask import jsonify
 
 # Importing db_instance class from db.py
 from utils.db import db_instance
+from models.Vote import Vote
 
 def generate_objectid():
     """Generate a new ObjectId."""
@@ -15,37 +18,16 @@ def generate_objectid():
         print(f"Error generating ObjectId: {e}")
         raise
 
-def serialize_user(user):
-    """Convert MongoDB user document to a JSON-serializable format."""
-    if not user:
-        return None
-
-    # Convert the _id field
-    if "_id" in user:
-        user["_id"] = str(user["_id"])
-
-    # Convert all fields that may contain ObjectIds
-    fields_to_convert = ["pollsCreated", "paymentsMade", "comments","interactionHistory","likedPolls","dislikedPolls"]
-
-    for field in fields_to_convert:
-        if field in user and isinstance(user[field], list):
-            user[field] = [str(obj_id) for obj_id in user[field] if isinstance(obj_id, ObjectId)]
-
-    # Convert ObjectId in nested votesCast list
-    if "votesCast" in user and isinstance(user["votesCast"], list):
-        for vote in user["votesCast"]:
-            if "pollId" in vote:
-                vote["pollId"] = str(vote["pollId"])
-            if "optionId" in vote:
-                vote["optionId"] = str(vote["optionId"])
-
-    return user
-
+# Engagement score changes per action (also used to weight CF interactions)
+ENGAGEMENT_SCORES = {
+    "view": 0.5, "click": 1, "vote": 2, "comment": 3
+}
 
 class User:
     def __init__(self):
         self.collection = db_instance.get_collection("users")
         self.db = db_instance  # Store db_instance to access other collections later if needed
+        self.vote_model = Vote()
 
     def create_user(self, pi_user_id, username, email=None):
         """Insert a new user into the database."""
@@ -57,7 +39,6 @@ class User:
                 "authToken": None,
                 "createdAt": datetime.utcnow(),
                 "pollsCreated": [],
-                "votesCast": [] ,
                 "paymentsMade":[],
                 "comments": [],  # List of comment IDs (if storing separately)
                 "interestedTopics": [],  # Topics from interacted polls (CBF)
@@ -85,7 +66,7 @@ class User:
         try:
             #return self.collection.find_one({"_id": ObjectId(user_id)})
             user = self.collection.find_one({"piUserId": user_id})
-            return serialize_user(user)  # Directly return the serialized version
+            return user  # ObjectIds are encoded by the app's JSON provider
         except PyMongoError as e:
             print(f"Error fetching user by ID: {e}")
             raise
@@ -99,38 +80,51 @@ class User:
             raise
 
     def add_vote_to_user(self, pi_user_id, poll_id, option_id,session=None):
-        """Record the user's vote by updating their votesCast field."""
-        try:
-            vote_entry = {"pollId": poll_id, "optionId": option_id, "votedAt": datetime.now(timezone.utc)}
+        """Record the user's vote in the votes collection (not on the user document)."""
+        return self.vote_model.record_vote(poll_id, pi_user_id, option_id, session)
 
-            result = self.collection.update_one(
-                {"piUserId": pi_user_id},
-                {"$push": {"votesCast": vote_entry}}
-            ,session=session)
+    def remove_vote_from_user(self, pi_user_id, poll_id, session=None):
+        """Undo a vote recorded by add_vote_to_user."""
+        return self.vote_model.delete_vote(poll_id, pi_user_id, session)
 
-            if result.modified_count == 0:
-                print("User not found or vote not recorded.")
-            return result
+
+    def migrate_votes_cast_to_votes(self, batch_size=1000):
+        """
+        Copy legacy users.votesCast entries into the votes collection with upserts
+        keyed on (pollId, userId), so votes already there are left alone.
+        Returns the number of votes inserted.
+        """
+        try:
+            inserted = 0
+            operations = []
+            users = self.collection.find(
+                {"votesCast.0": {"$exists": True}}, {"piUserId": 1, "votesCast": 1}
+            ).batch_size(batch_size)
+            for user in users:
+                for vote in user["votesCast"]:
+                    try:
+                        poll_id = ObjectId(vote["pollId"])
+                    except (KeyError, InvalidId, TypeError):
+                        continue  # Nothing to key the vote on
+                    key = {"pollId": poll_id, "userId": str(user["piUserId"])}
+                    operations.append(UpdateOne(key, {"$setOnInsert": {
+                        **key,
+                        "optionId": vote.get("optionId"),
+                        "votedAt": vote.get("votedAt") or datetime.now(timezone.utc)
+                    }}, upsert=True))
+                if len(operations) >= batch_size:
+                    inserted += self.vote_model.collection.bulk_write(operations, ordered=False).upserted_count
+                    operations = []
+            if operations:
+                inserted += self.vote_model.collection.bulk_write(operations, ordered=False).upserted_count
+            return inserted
         except PyMongoError as e:
-            print(f"Error recording vote for user: {e}")
+            print(f"Error migrating votesCast to votes: {e}")
             raise
 
-
     def has_user_voted(self, poll_id, user_id):
         """Check if the user has already voted on a specific poll."""
-        try:
-            user = self.get_user_by_id(user_id)
-            
-            if not user:  # If user not found, return False
-                print(f"User {user_id} not found.")
-                return False
-
-            #print("inside user voted")
-            return any(vote.get("pollId") == poll_id for vote in user.get("votesCast", []))
-
-        except PyMongoError as e:
-            print(f"Error checking user voting status: {e}")
-            raise
+        return self.vote_model.has_voted(poll_id, user_id)
 
 
     def update_user(self, user_id, update_fields):
@@ -292,12 +286,7 @@ class User:
             disliked_polls = set(user.get("dislikedPolls", []))
             poll_obj_id = ObjectId(poll_id)
 
-            # Define engagement score changes
-            score_map = {
-                "view": 0.5, "click": 1, "vote": 2, "comment": 3
-            }
-
-            score_change = score_map.get(action_type, 0)  # Default to 0 if not found
+            score_change = ENGAGEMENT_SCORES.get(action_type, 0)  # Default to 0 if not found
 
             # Handle like/dislike transitions
             if action_type == "like":
@@ -0,0 +1,62 @@
+from bson import ObjectId
+from datetime import datetime, timezone
+from pymongo.errors import PyMongoError, DuplicateKeyError
+
+# Importing db_instance class from db.py
+from utils.db import db_instance
+
+class Vote:
+    """
+    One document per (pollId, userId) pair, guarded by a unique compound index.
+    Keeps the duplicate-vote check an index probe instead of a scan over the
+    user's vote history.
+    """
+    def __init__(self):
+        self.collection = db_instance.get_collection("votes")
+
+    def record_vote(self, poll_id, user_id, option_id, session=None):
+        """Insert a vote; raises ValueError if the user already voted on this poll."""
+        try:
+            vote = {
+                "pollId": ObjectId(poll_id),
+                "userId": str(user_id),
+                "optionId": option_id,
+                "votedAt": datetime.now(timezone.utc)
+            }
+            return self.collection.insert_one(vote, session=session)
+        except DuplicateKeyError:
+            raise ValueError("You have already voted on this poll.")
+        except PyMongoError as e:
+            print(f"Error recording vote: {e}")
+            raise
+
+    def delete_vote(self, poll_id, user_id, session=None):
+        """Remove a user's vote on a poll (used to undo a vote that could not be counted)."""
+        try:
+            return self.collection.delete_one(
+                {"pollId": ObjectId(poll_id), "userId": str(user_id)},
+                session=session
+            )
+        except PyMongoError as e:
+            print(f"Error deleting vote: {e}")
+            raise
+
+    def has_voted(self, poll_id, user_id):
+        """Check if a vote exists for this user and poll using the unique index."""
+        try:
+            vote = self.collection.find_one(
+                {"pollId": ObjectId(poll_id), "userId": str(user_id)},
+                {"_id": 1}
+            )
+            return vote is not None
+        except PyMongoError as e:
+            print(f"Error checking vote: {e}")
+            raise
+
+    def get_votes_by_user(self, user_id):
+        """Retrieve all votes cast by a user."""
+        try:
+            return list(self.collection.find({"userId": str(user_id)}))
+        except PyMongoError as e:
+            print(f"Error fetching votes by user: {e}")
+            raise
@@ -1,9 +1,26 @@
 from app import app, socketio  # Import app and socketio from app.py
 
+from flask_socketio import join_room, leave_room
+from utils.vote_broadcaster import poll_room
+
 @socketio.on("connect")
 def handle_connect():
     print("✅ Client connected to WebSocket")
 
+@socketio.on("subscribe_poll")
+def handle_subscribe_poll(data):
+    """Join the room that receives live vote updates for a poll."""
+    poll_id = (data or {}).get("poll_id")
+    if poll_id:
+        join_room(poll_room(poll_id))
+
+@socketio.on("unsubscribe_poll")
+def handle_unsubscribe_poll(data):
+    """Leave a poll's live vote update room."""
+    poll_id = (data or {}).get("poll_id")
+    if poll_id:
+        leave_room(poll_room(poll_id))
+
 if __name__ == "__main__":
     print("🚀 Starting WebSocket server...")
     socketio.run(app, host="0.0.0.0", port=5000, debug=True)
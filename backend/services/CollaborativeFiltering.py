@@ -1,27 +1,140 @@
-from models.User import User
+import os
+import numpy as np
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import ReplaceOne
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+from models.User import ENGAGEMENT_SCORES
 from models.Poll import Poll
-from utils.similarity import compute_similarity
+from utils.db import db_instance
+
+CF_NEIGHBOURS = int(os.getenv("CF_NEIGHBOURS", 50))  # Top-K neighbours kept per poll
+CF_HISTORY_LIMIT = int(os.getenv("CF_HISTORY_LIMIT", 200))  # Most recent interactions used to score a user
+CF_BLOCK_SIZE = int(os.getenv("CF_BLOCK_SIZE", 2048))  # Polls per similarity block during the offline build
+
+# Implicit-feedback weight of each action; a like counts like a new like in
+# User.update_user_engagement, dislikes and neutral resets carry no affinity.
+ACTION_WEIGHTS = {**ENGAGEMENT_SCORES, "like": 2}
+
+
+def build_interaction_matrix(interactions_collection):
+    """Aggregate the interactions collection into a weighted sparse user x poll matrix."""
+    weight_branches = [
+        {"case": {"$eq": ["$actionType", action]}, "then": weight}
+        for action, weight in ACTION_WEIGHTS.items()
+    ]
+    pairs = interactions_collection.aggregate([
+        {"$match": {"actionType": {"$in": list(ACTION_WEIGHTS)}}},
+        {"$group": {
+            "_id": {"userId": "$userId", "pollId": "$pollId"},
+            "weight": {"$sum": {"$switch": {"branches": weight_branches, "default": 0}}}
+        }}
+    ], allowDiskUse=True)
+
+    user_index, poll_index = {}, {}
+    rows, cols, values = [], [], []
+    for pair in pairs:
+        rows.append(user_index.setdefault(pair["_id"]["userId"], len(user_index)))
+        cols.append(poll_index.setdefault(str(pair["_id"]["pollId"]), len(poll_index)))
+        values.append(pair["weight"])
+
+    matrix = csr_matrix(
+        (np.asarray(values, dtype=np.float32), (rows, cols)),
+        shape=(len(user_index), len(poll_index))
+    )
+    return matrix, list(poll_index)
+
+
+def compute_item_neighbours(matrix, poll_ids, k=CF_NEIGHBOURS, block_size=CF_BLOCK_SIZE):
+    """Yield (poll_id, [(neighbour_id, cosine)]) with the top-k co-interaction neighbours per poll."""
+    item_vectors = normalize(matrix.T.tocsr(), norm="l2")  # poll x user
+    item_vectors_t = item_vectors.T.tocsc()
+    for start in range(0, item_vectors.shape[0], block_size):
+        similarities = (item_vectors[start:start + block_size] @ item_vectors_t).tocsr()
+        for offset in range(similarities.shape[0]):
+            row = similarities.getrow(offset)
+            item = start + offset
+            mask = row.indices != item
+            indices, scores = row.indices[mask], row.data[mask]
+            if len(indices) > k:
+                top = np.argpartition(-scores, k)[:k]
+                indices, scores = indices[top], scores[top]
+            order = np.argsort(-scores)
+            yield poll_ids[item], [(poll_ids[j], float(s)) for j, s in zip(indices[order], scores[order])]
+
+
+def build_item_neighbours(batch_size=1000):
+    """Offline job: recompute and store the top-K neighbour list of every poll."""
+    interactions = db_instance.get_collection("interactions")
+    neighbours_collection = db_instance.get_collection("poll_neighbours")
+
+    matrix, poll_ids = build_interaction_matrix(interactions)
+    print(f"🧮 Interaction matrix: {matrix.shape[0]} users x {matrix.shape[1]} polls, {matrix.nnz} entries")
+
+    operations = []
+    for poll_id, neighbours in compute_item_neighbours(matrix, poll_ids):
+        operations.append(ReplaceOne(
+            {"_id": poll_id},
+            {"_id": poll_id, "neighbours": [{"pollId": n, "score": s} for n, s in neighbours]},
+            upsert=True
+        ))
+        if len(operations) >= batch_size:
+            neighbours_collection.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        neighbours_collection.bulk_write(operations, ordered=False)
+    print(f"✅ Stored neighbours for {len(poll_ids)} polls")
+
 
 class CollaborativeFiltering:
-    """Collaborative Filtering Recommendation Engine."""
+    """Item-item Collaborative Filtering over precomputed neighbour lists."""
 
     def __init__(self):
-        self.user_model = User()
         self.poll_model = Poll()
+        self.interactions = db_instance.get_collection("interactions")
+        self.neighbours = db_instance.get_collection("poll_neighbours")
+
+    def get_user_history(self, user_id):
+        """Weighted affinity per poll from the user's most recent interactions."""
+        history = {}
+        recent = self.interactions.find(
+            {"userId": str(user_id)}, {"pollId": 1, "actionType": 1}
+        ).sort("timestamp", -1).limit(CF_HISTORY_LIMIT)
+        for interaction in recent:
+            weight = ACTION_WEIGHTS.get(interaction.get("actionType"), 0)
+            if weight:
+                poll_id = str(interaction["pollId"])
+                history[poll_id] = history.get(poll_id, 0) + weight
+        return history
 
     def get_recommendations(self, user_id, top_n=10):
-        """Generate CF-based recommendations for a user."""
-        user = self.user_model.get_user_by_id(user_id)
-        if not user or not user.get("interactionHistory"):
+        """Generate CF-based recommendations by summing the user's neighbour lists."""
+        history = self.get_user_history(user_id)
+        if not history:
             return []
 
-        interacted_polls = user["interactionHistory"]
-        all_polls = self.poll_model.get_active_polls()
-
         scores = {}
-        for poll in all_polls:
-            similarity = compute_similarity(interacted_polls, poll["_id"])
-            scores[poll["_id"]] = similarity
+        for entry in self.neighbours.find({"_id": {"$in": list(history)}}):
+            weight = history[entry["_id"]]
+            for neighbour in entry.get("neighbours", []):
+                if neighbour["pollId"] not in history:
+                    scores[neighbour["pollId"]] = scores.get(neighbour["pollId"], 0) + weight * neighbour["score"]
+        if not scores:
+            return []
+
+        # Only recommend polls that are still open
+        candidates = [ObjectId(poll_id) for poll_id in scores if ObjectId.is_valid(poll_id)]
+        active = {
+            str(poll["_id"]) for poll in self.poll_model.collection.find(
+                {"_id": {"$in": candidates}, "isActive": True, "visibility": "public",
+                 "expiresAt": {"$gt": datetime.now(timezone.utc)}}, {"_id": 1}
+            )
+        }
+        ranked = sorted((poll_id for poll_id in scores if poll_id in active), key=scores.get, reverse=True)
+        return ranked[:top_n]
+
 
-        sorted_polls = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        return [poll_id for poll_id, _ in sorted_polls[:top_n]]
+# Run the offline neighbour build
+if __name__ == "__main__":
+    build_item_neighbours()
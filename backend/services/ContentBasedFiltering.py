@@ -1,14 +1,17 @@
 from models.User import User
 from models.Poll import Poll
-from utils.feature_extraction import get_feature_vector
-from utils.similarity import cosine_similarity
+from utils.feature_extraction import text_to_vector, vectors_to_matrix, start_feature_refitter
+from services.poll_index import get_poll_index
 
 class ContentBasedFiltering:
     """Content-Based Filtering Recommendation Engine."""
 
-    def __init__(self):
+    def __init__(self, watch=True):
         self.user_model = User()
         self.poll_model = Poll()
+        if watch:
+            start_feature_refitter(self.poll_model.collection)
+        self.poll_index = get_poll_index(self.poll_model.collection, watch=watch)
 
     def get_recommendations(self, user_id, top_n=10):
         """Generate CBF-based recommendations for a user."""
@@ -16,14 +19,6 @@ class ContentBasedFiltering:
         if not user or not user.get("interestedTopics"):
             return []
 
-        user_vector = get_feature_vector(user["interestedTopics"])
-        all_polls = self.poll_model.get_active_polls()
-
-        scores = {}
-        for poll in all_polls:
-            if poll.get("featureVector"):
-                similarity = cosine_similarity(user_vector, poll["featureVector"])
-                scores[poll["_id"]] = similarity
-
-        sorted_polls = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        return [poll_id for poll_id, _ in sorted_polls[:top_n]]
+        # One sparse dot product against the resident active-poll matrix
+        user_vector = vectors_to_matrix([text_to_vector(" ".join(user["interestedTopics"]))])
+        return self.poll_index.top_n(user_vector, top_n)
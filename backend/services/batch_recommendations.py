@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from scipy.sparse import csr_matrix
+from pymongo import UpdateOne
+
+from services.CollaborativeFiltering import ACTION_WEIGHTS
+from utils.db import db_instance
+from utils.feature_extraction import FeatureRefitter, idf_model, text_to_vector, vectors_to_matrix
+
+# Offline job: score users in chunks as sparse users x polls matrix products
+# on a process pool, instead of one HybridRecommender call per user.
+#   python -m services.batch_recommendations           every user
+#   python -m services.batch_recommendations --active  users with interactions in the last REC_BATCH_ACTIVE_DAYS
+REC_BATCH_CHUNK = int(os.getenv("REC_BATCH_CHUNK", 1000))  # Users per task
+REC_BATCH_WORKERS = int(os.getenv("REC_BATCH_WORKERS", os.cpu_count() or 1))
+REC_BATCH_ACTIVE_DAYS = float(os.getenv("REC_BATCH_ACTIVE_DAYS", 7))
+REC_BATCH_TOP_N = int(os.getenv("REC_BATCH_TOP_N", 10))
+
+# Per-worker state, set once by _init_worker
+_worker = {}
+
+
+def load_scoring_matrices(polls, neighbours):
+    """
+    Build the shared, read-only scoring state.
+
+    Returns (active_ids, poll_rows, poll_matrix_t, neighbour_matrix, row_to_col):
+    the open public polls that can be recommended, a {poll_id: row} index over
+    every poll a history can refer to usefully, the IDF-weighted poll vectors
+    transposed (FEATURE_DIM x polls), the CF neighbour matrix (rows x polls)
+    and the active column of each row (-1 when that poll is closed).
+    """
+    now = datetime.now(timezone.utc)
+    active = list(polls.find(
+        {"visibility": "public", "isActive": True, "expiresAt": {"$gt": now}, "featureVector": {"$ne": None}},
+        {"featureVector": 1}
+    ))
+    active_ids = [str(poll["_id"]) for poll in active]
+    columns = {poll_id: col for col, poll_id in enumerate(active_ids)}
+    poll_matrix_t = idf_model.transform(vectors_to_matrix([poll["featureVector"] for poll in active])).T.tocsr()
+
+    poll_rows = dict(columns)  # Active polls first, so row == column for them
+    rows, cols, values = [], [], []
+    for entry in neighbours.find({}):
+        for neighbour in entry.get("neighbours", []):
+            col = columns.get(neighbour["pollId"])
+            if col is not None:
+                rows.append(poll_rows.setdefault(entry["_id"], len(poll_rows)))
+                cols.append(col)
+                values.append(neighbour["score"])
+    neighbour_matrix = csr_matrix(
+        (np.asarray(values, dtype=np.float32), (rows, cols)), shape=(len(poll_rows), len(active_ids))
+    )
+    row_to_col = np.full(len(poll_rows), -1, dtype=np.int64)
+    row_to_col[:len(active_ids)] = np.arange(len(active_ids))
+    return active_ids, poll_rows, poll_matrix_t, neighbour_matrix, row_to_col
+
+
+def _init_worker(active_ids, poll_matrix_t, neighbour_matrix, row_to_col, fallback, top_n):
+    _worker.update(
+        active_ids=np.array(active_ids, dtype=object),
+        poll_matrix_t=poll_matrix_t,
+        neighbour_matrix=neighbour_matrix,
+        row_to_col=row_to_col,
+        fallback=fallback,
+        top_n=top_n,
+    )
+
+
+def _top_k(scores, k, exclude=()):
+    """Column indices of the k highest positive entries of one sparse row, best first."""
+    indices, values = scores.indices, scores.data
+    if len(exclude):
+        keep = ~np.isin(indices, exclude)
+        indices, values = indices[keep], values[keep]
+    keep = values > 0
+    indices, values = indices[keep], values[keep]
+    if len(indices) > k:
+        top = np.argpartition(-values, k)[:k]
+        indices, values = indices[top], values[top]
+    return indices[np.argsort(-values)]
+
+
+def score_chunk(user_ids, user_vectors, history):
+    """
+    Worker task: score one chunk and write it back.
+
+    user_vectors is the IDF-weighted topic matrix (users x FEATURE_DIM) and
+    history the weighted interaction matrix (users x poll rows). CF scores are
+    history @ neighbours with already-seen polls removed, CBF scores are
+    topics @ polls; they are merged the way HybridRecommender does, CF first,
+    and topped up from the shared fallback list.
+    """
+    from services import recommendation_cache
+
+    top_n = _worker["top_n"]
+    active_ids = _worker["active_ids"]
+    cf_scores = (history @ _worker["neighbour_matrix"]).tocsr()
+    cbf_scores = (user_vectors @ _worker["poll_matrix_t"]).tocsr()
+
+    results = []
+    for i, user_id in enumerate(user_ids):
+        seen = _worker["row_to_col"][history.indices[history.indptr[i]:history.indptr[i + 1]]]
+        cf = active_ids[_top_k(cf_scores.getrow(i), top_n, seen[seen >= 0])].tolist()
+        cbf = active_ids[_top_k(cbf_scores.getrow(i), top_n)].tolist()
+        recommendations = list(dict.fromkeys(cf + cbf))[:top_n]
+        if len(recommendations) < top_n:
+            chosen = set(recommendations)
+            recommendations += [poll_id for poll_id in _worker["fallback"] if poll_id not in chosen][:top_n - len(recommendations)]
+        results.append((user_id, recommendations))
+
+    users = db_instance.get_collection("users")
+    users.bulk_write(
+        [UpdateOne({"piUserId": user_id}, {"$set": {"recommendationVector": recs}}) for user_id, recs in results],
+        ordered=False
+    )
+    recommendation_cache.store_many(results)
+    return len(results)
+
+
+def _history_matrix(interactions, user_ids, poll_rows):
+    """Weighted (users x poll rows) interaction matrix for one chunk, in one aggregation."""
+    weight_branches = [
+        {"case": {"$eq": ["$actionType", action]}, "then": weight}
+        for action, weight in ACTION_WEIGHTS.items()
+    ]
+    user_index = {str(user_id): i for i, user_id in enumerate(user_ids)}  # Interactions store ids as strings
+    rows, cols, values = [], [], []
+    for pair in interactions.aggregate([
+        {"$match": {"userId": {"$in": list(user_index)}, "actionType": {"$in": list(ACTION_WEIGHTS)}}},
+        {"$group": {
+            "_id": {"userId": "$userId", "pollId": "$pollId"},
+            "weight": {"$sum": {"$switch": {"branches": weight_branches, "default": 0}}}
+        }}
+    ]):
+        row = poll_rows.get(str(pair["_id"]["pollId"]))  # Closed polls without neighbours add nothing
+        if row is not None:
+            rows.append(user_index[pair["_id"]["userId"]])
+            cols.append(row)
+            values.append(pair["weight"])
+    return csr_matrix(
+        (np.asarray(values, dtype=np.float32), (rows, cols)), shape=(len(user_ids), len(poll_rows))
+    )
+
+
+def iter_user_chunks(users, interactions, active_only=False, chunk_size=REC_BATCH_CHUNK):
+    """Yield lists of {piUserId, interestedTopics} user documents, chunk_size at a time."""
+    projection = {"piUserId": 1, "interestedTopics": 1}
+    if not active_only:
+        chunk = []
+        for user in users.find({}, projection).sort("_id", 1).batch_size(chunk_size):
+            chunk.append(user)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+        return
+
+    since = datetime.now(timezone.utc) - timedelta(days=REC_BATCH_ACTIVE_DAYS)
+    active = interactions.aggregate(
+        [{"$match": {"timestamp": {"$gte": since}}}, {"$group": {"_id": "$userId"}}],
+        allowDiskUse=True, batchSize=chunk_size
+    )
+    user_ids = []
+    for entry in active:
+        user_ids.append(entry["_id"])
+        if len(user_ids) >= chunk_size:
+            yield list(users.find({"piUserId": {"$in": user_ids}}, projection))
+            user_ids = []
+    if user_ids:
+        yield list(users.find({"piUserId": {"$in": user_ids}}, projection))
+
+
+def run_batch(active_only=False, workers=REC_BATCH_WORKERS, top_n=REC_BATCH_TOP_N):
+    """Recompute and store recommendations for every (or every recently active) user."""
+    from services.fallback_strategy import FallbackStrategy
+
+    started = time.monotonic()
+    polls = db_instance.get_collection("polls")
+    interactions = db_instance.get_collection("interactions")
+    users = db_instance.get_collection("users")
+
+    FeatureRefitter(polls).refit()
+    active_ids, poll_rows, poll_matrix_t, neighbour_matrix, row_to_col = load_scoring_matrices(
+        polls, db_instance.get_collection("poll_neighbours")
+    )
+    fallback = FallbackStrategy().get_fallback_polls(top_n * 2)
+    print(f"🧮 Scoring against {len(active_ids)} open polls, {neighbour_matrix.nnz} neighbour links")
+
+    done = 0
+    pending = set()
+    # spawn: MongoClient is not fork-safe; the matrices are shipped to each worker once
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(active_ids, poll_matrix_t, neighbour_matrix, row_to_col, fallback, top_n),
+    ) as executor:
+        for chunk in iter_user_chunks(users, interactions, active_only):
+            user_ids = [user["piUserId"] for user in chunk]
+            user_vectors = idf_model.transform(vectors_to_matrix([
+                text_to_vector(" ".join(user.get("interestedTopics") or [])) for user in chunk
+            ]))
+            history = _history_matrix(interactions, user_ids, poll_rows)
+            pending.add(executor.submit(score_chunk, user_ids, user_vectors, history))
+
+            # Bound the number of chunks held in memory
+            if len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                done += sum(future.result() for future in finished)
+        for future in pending:
+            done += future.result()
+
+    print(f"✅ Recommendations stored for {done} users in {time.monotonic() - started:.1f}s")
+    return done
+
+
+if __name__ == "__main__":
+    run_batch(active_only="--active" in sys.argv[1:])
@@ -1,5 +1,5 @@
 from models.Poll import Poll
-import random
+from utils import trending, active_polls
 from datetime import datetime, timedelta, timezone
 
 class FallbackStrategy:
@@ -18,18 +18,19 @@ class FallbackStrategy:
         # Merge all strategies to ensure diversity
         return trending_polls + recent_polls + random_polls
 
-    def get_trending_polls(self, num_polls=3):
-        """Fetches polls with the highest engagement in recent days."""
-        trending_polls = self.poll_model.get_polls_sorted_by("engagementMetrics.votes", descending=True, limit=num_polls)
-        return [poll["_id"] for poll in trending_polls]
+    def get_trending_polls(self, num_polls=3, topic=None):
+        """Fetches polls with the highest recent (time-decayed) engagement."""
+        if num_polls <= 0:
+            return []
+        # Cold trending sets return nothing; get_fallback_polls fills the slots with random polls
+        return self.poll_model.filter_open_public(trending.get_trending(num_polls, topic))
 
     def get_recent_polls(self, num_polls=3):
         """Fetches newly created polls within the last 7 days."""
         one_week_ago = datetime.now(timezone.utc) - timedelta(days=7)
         recent_polls = self.poll_model.get_polls_filtered({"createdAt": {"$gte": one_week_ago}}, limit=num_polls)
-        return [poll["_id"] for poll in recent_polls]
+        return [str(poll["_id"]) for poll in recent_polls]
 
     def get_random_polls(self, num_polls=3):
-        """Fetches a random set of polls to increase diversity."""
-        all_polls = self.poll_model.get_active_polls()
-        return [poll["_id"] for poll in random.sample(all_polls, min(num_polls, len(all_polls)))]
+        """Fetches a random set of active polls to increase diversity."""
+        return active_polls.sample(self.poll_model.collection, num_polls)
@@ -3,18 +3,19 @@ from services.ContentBasedFiltering import ContentBasedFiltering
 from services.fallback_strategy import FallbackStrategy
 from utils.db import db_instance
 from models.User import User
-from utils.redis_session import delete_cached_recommendations
+from services import recommendation_cache
 
 #sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 user_model = User()
+_shared_recommender = None
 
 class HybridRecommender:
     """
     Combines Collaborative Filtering (CF), Content-Based Filtering (CBF), and Fallback strategies.
     """
-    def __init__(self):
+    def __init__(self, watch=True):
         self.cf_engine = CollaborativeFiltering()
-        self.cbf_engine = ContentBasedFiltering()
+        self.cbf_engine = ContentBasedFiltering(watch=watch)
         self.fallback_strategy = FallbackStrategy()
         self.db_client = db_instance.client
 
@@ -31,9 +32,7 @@ class HybridRecommender:
         cf_recommendations = self.cf_engine.get_recommendations(user_id, top_n)
         cbf_recommendations = self.cbf_engine.get_recommendations(user_id, top_n)
 
-        combined_recommendations = self.merge_recommendations(cf_recommendations, cbf_recommendations, top_n)
-        delete_cached_recommendations(user_id)
-        return combined_recommendations
+        return self.merge_recommendations(cf_recommendations, cbf_recommendations, top_n)
 
     def merge_recommendations(self, cf_recs, cbf_recs, top_n):
         """
@@ -54,13 +53,23 @@ class HybridRecommender:
         return final_recommendations[:top_n]  # Ensure correct limit
 
     @staticmethod
-    def update_recommendations(user_id):
+    def get_shared(watch=True):
+        """One recommender per process; building engines per call re-creates every model."""
+        global _shared_recommender
+        if _shared_recommender is None:
+            _shared_recommender = HybridRecommender(watch=watch)
+        return _shared_recommender
+
+    @staticmethod
+    def update_recommendations(user_id, watch=True):
         """
         Updates the user's recommendation vector in the database.
+        watch=False builds the shared recommender on a read-only poll snapshot.
         """
-        recommender = HybridRecommender()
+        recommender = HybridRecommender.get_shared(watch)
         recommendations = recommender.generate_recommendations(user_id)
 
-        # Update the user document in the database
+        # Update the user document in the database and the serving cache
         user_model.update_user_recommendations(user_id,recommendations)
+        recommendation_cache.store(user_id, recommendations)
         print(f"📌 Updated recommendations for user {user_id}")
@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+import numpy as np
+from pymongo.errors import PyMongoError
+
+from utils.feature_extraction import vectors_to_matrix, idf_model, fit_idf
+from models.Poll import parse_expires_at
+
+# Minimum seconds between matrix rebuilds when change events arrive
+POLL_INDEX_REBUILD_INTERVAL = float(os.getenv("POLL_INDEX_REBUILD_INTERVAL", 1.0))
+# Seconds an unwatched (snapshot) index serves before reloading polls and IDF
+POLL_INDEX_SNAPSHOT_TTL = float(os.getenv("POLL_INDEX_SNAPSHOT_TTL", 300))
+
+INDEX_PROJECTION = {"featureVector": 1, "expiresAt": 1, "isActive": 1, "visibility": 1}
+
+
+def _expiry_timestamp(expires_at):
+    """Convert expiresAt (date or ISO string) to epoch seconds; no expiry is +inf."""
+    expires_at = parse_expires_at(expires_at)
+    return expires_at.timestamp() if expires_at else np.inf
+
+
+def _is_indexable(poll):
+    return bool(poll and poll.get("isActive") and poll.get("visibility") == "public" and poll.get("featureVector"))
+
+
+class PollScoringIndex:
+    """
+    Resident CSR matrix of active public poll vectors plus an id array.
+    Kept in sync with a change stream on the polls collection, and rebuilt
+    lazily (at most once per POLL_INDEX_REBUILD_INTERVAL) after changes.
+    With a snapshot_ttl it is never watched; it reloads polls and refits IDF
+    itself once the snapshot is that many seconds old.
+    """
+
+    def __init__(self, collection, snapshot_ttl=None):
+        self.collection = collection
+        self.snapshot_ttl = snapshot_ttl
+        self._loaded_at = None
+        self._rows = {}  # {poll_id: (featureVector, expiry_ts)}
+        self._ids = np.array([], dtype=object)
+        self._expiries = np.array([], dtype=np.float64)
+        self._matrix = None
+        self._idf_version = None
+        self._dirty = True
+        self._last_build = 0.0
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def start(self):
+        """Load every active poll and start following change events."""
+        self.load()
+        if not self._watcher:
+            self._watcher = threading.Thread(target=self._watch, name="poll-index-watcher", daemon=True)
+            self._watcher.start()
+
+    def load(self):
+        rows = {}
+        for poll in self.collection.find({"isActive": True, "visibility": "public"}, INDEX_PROJECTION):
+            if _is_indexable(poll):
+                rows[str(poll["_id"])] = (poll["featureVector"], _expiry_timestamp(poll.get("expiresAt")))
+        with self._lock:
+            self._rows = rows
+            self._dirty = True
+            self._loaded_at = time.monotonic()
+
+    def refresh_snapshot(self):
+        """Reload the rows and refit IDF, for indexes that do not follow the change stream."""
+        fit_idf(self.collection)
+        self.load()
+
+    def apply_change(self, change):
+        """Upsert or drop one poll from a change stream event."""
+        poll_id = str(change["documentKey"]["_id"])
+        poll = change.get("fullDocument")
+        with self._lock:
+            if change["operationType"] != "delete" and _is_indexable(poll):
+                self._rows[poll_id] = (poll["featureVector"], _expiry_timestamp(poll.get("expiresAt")))
+            else:
+                self._rows.pop(poll_id, None)
+            self._dirty = True
+
+    def _watch(self):
+        # Votes and engagement counters update polls constantly; only follow
+        # updates that touch a field the index reads (all are written whole)
+        indexed_update = [{f"updateDescription.updatedFields.{field}": {"$exists": True}} for field in INDEX_PROJECTION]
+        indexed_update.append({"updateDescription.removedFields": {"$in": list(INDEX_PROJECTION)}})
+        pipeline = [
+            {"$match": {"$or": [
+                {"operationType": {"$in": ["insert", "replace", "delete"]}},
+                {"operationType": "update", "$or": indexed_update}
+            ]}},
+            {"$project": {"operationType": 1, "documentKey": 1,
+                          **{f"fullDocument.{field}": 1 for field in INDEX_PROJECTION}}}
+        ]
+        while True:
+            try:
+                with self.collection.watch(pipeline, full_document="updateLookup") as stream:
+                    for change in stream:
+                        self.apply_change(change)
+            except PyMongoError as e:
+                print(f"❌ Poll index change stream failed, resyncing: {e}")
+                time.sleep(1)
+                try:
+                    self.load()
+                except PyMongoError as load_error:
+                    print(f"❌ Poll index resync failed: {load_error}")
+
+    def _ensure_matrix(self):
+        if self.snapshot_ttl is not None and time.monotonic() - self._loaded_at >= self.snapshot_ttl:
+            self.refresh_snapshot()
+        idf_version = idf_model.version
+        with self._lock:
+            # A refitted IDF is just another change: rebuild at most once per interval
+            changed = self._dirty or idf_version != self._idf_version
+            stale = changed and time.monotonic() - self._last_build >= POLL_INDEX_REBUILD_INTERVAL
+            if self._matrix is not None and not stale:
+                return self._ids, self._expiries, self._matrix
+            ids = list(self._rows.keys())
+            rows = [self._rows[poll_id] for poll_id in ids]
+            self._dirty = False
+            self._last_build = time.monotonic()
+
+        matrix = idf_model.transform(vectors_to_matrix([row[0] for row in rows]))
+        with self._lock:
+            self._ids = np.array(ids, dtype=object)
+            self._expiries = np.array([row[1] for row in rows], dtype=np.float64)
+            self._matrix = matrix
+            self._idf_version = idf_version
+            return self._ids, self._expiries, self._matrix
+
+    def top_n(self, query_vector, top_n=10):
+        """Score a (1, FEATURE_DIM) query against every active poll and return the best ids."""
+        ids, expiries, matrix = self._ensure_matrix()
+        if not len(ids):
+            return []
+
+        scores = (matrix @ idf_model.transform(query_vector).T).toarray().ravel()
+        scores[expiries <= time.time()] = 0  # Expired since the last change event
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_n:
+            candidates = candidates[np.argpartition(-scores[candidates], top_n)[:top_n]]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return ids[ranked].tolist()
+
+
+_poll_index = None
+_poll_index_lock = threading.Lock()
+
+
+def get_poll_index(collection, watch=True):
+    """
+    Shared scoring index for this process. With watch=False (pool workers) it
+    is a periodically reloaded snapshot: no change stream, no refitter thread.
+    """
+    global _poll_index
+    with _poll_index_lock:
+        if _poll_index is None:
+            if watch:
+                _poll_index = PollScoringIndex(collection)
+                _poll_index.start()
+            else:
+                _poll_index = PollScoringIndex(collection, snapshot_ttl=POLL_INDEX_SNAPSHOT_TTL)
+                _poll_index.refresh_snapshot()
+    return _poll_index
@@ -0,0 +1,201 @@
+import os
+import time
+import threading
+import redis
+from collections import OrderedDict
+
+from utils.redis_session import redis_client
+from utils.json_encoder import dumps, loads
+
+# Two tiers: a small per-process LRU in front of Redis. Entries past
+# REC_CACHE_FRESH seconds are still served, but queue a recompute; entries
+# only disappear after REC_CACHE_MAX_AGE. Web workers only enqueue users in
+# Redis; the recomputes run wherever a RecommendationPrecomputer drains that
+# queue (the Kafka consumer process).
+REC_CACHE_FRESH = float(os.getenv("REC_CACHE_FRESH", 300))  # Seconds before an entry is revalidated
+REC_CACHE_MAX_AGE = int(os.getenv("REC_CACHE_MAX_AGE", 24 * 3600))  # Seconds an entry may be served at all
+REC_LOCAL_TTL = float(os.getenv("REC_LOCAL_TTL", 10))  # Seconds an entry stays in-process
+REC_LOCAL_MAX_ENTRIES = int(os.getenv("REC_LOCAL_MAX_ENTRIES", 10000))
+REC_ACTIVE_WINDOW = float(os.getenv("REC_ACTIVE_WINDOW", 3600))  # Seconds a user counts as recently active
+REC_PRECOMPUTE_INTERVAL = float(os.getenv("REC_PRECOMPUTE_INTERVAL", 60))  # Seconds
+REC_PRECOMPUTE_BATCH = int(os.getenv("REC_PRECOMPUTE_BATCH", 1000))  # Most recent users checked per pass
+REC_QUEUE_POLL_INTERVAL = float(os.getenv("REC_QUEUE_POLL_INTERVAL", 1))  # Seconds between refresh queue drains
+REC_QUEUE_BATCH = int(os.getenv("REC_QUEUE_BATCH", 500))  # Users taken from the refresh queue per drain
+
+ACTIVE_USERS_KEY = "recs:active_users"  # ZSET {user_id: last seen}
+REFRESH_QUEUE_KEY = "recs:refresh_queue"  # SET of users waiting for a recompute
+PRECOMPUTE_LOCK_KEY = "recs:precompute:lock"  # Held for one interval by whichever process runs the pass
+
+
+def cache_key(user_id):
+    return f"recs:{user_id}"
+
+
+def store(user_id, recommendations):
+    """Write freshly computed recommendations to the shared tier."""
+    entry = {"recs": recommendations, "computedAt": time.time()}
+    try:
+        redis_client.set(cache_key(user_id), dumps(entry), ex=REC_CACHE_MAX_AGE)
+    except redis.RedisError as e:
+        print(f"⚠️ Failed to cache recommendations for user {user_id}: {e}")
+    return entry
+
+
+def store_many(results):
+    """Write many (user_id, recommendations) pairs in one pipelined round trip."""
+    now = time.time()
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for user_id, recommendations in results:
+            pipe.set(cache_key(user_id), dumps({"recs": recommendations, "computedAt": now}), ex=REC_CACHE_MAX_AGE)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"⚠️ Failed to cache batch recommendations: {e}")
+
+
+def load(user_id):
+    raw = redis_client.get(cache_key(user_id))
+    return loads(raw) if raw else None
+
+
+def touch(*user_ids):
+    """Record activity so the precomputer keeps these users' recommendations warm."""
+    if not user_ids:
+        return
+    try:
+        redis_client.zadd(ACTIVE_USERS_KEY, {str(user_id): time.time() for user_id in user_ids})
+    except redis.RedisError as e:
+        print(f"⚠️ Failed to record recommendation activity: {e}")
+
+
+def request_refresh(*user_ids):
+    """Queue users for a recompute; the set dedupes repeated requests."""
+    user_ids = [str(user_id) for user_id in user_ids if user_id]
+    if not user_ids:
+        return
+    try:
+        redis_client.sadd(REFRESH_QUEUE_KEY, *user_ids)
+    except redis.RedisError as e:
+        print(f"⚠️ Failed to queue recommendation refresh: {e}")
+
+
+def is_stale(entry, now=None):
+    return (now or time.time()) - entry["computedAt"] >= REC_CACHE_FRESH
+
+
+class RecommendationCache:
+    """
+    Serves recommendations without computing them on the request path: local LRU,
+    then Redis, then cheap fallback polls for a cold user. Stale and missing
+    entries are queued for a RecommendationPrecomputer, which writes the result
+    back to Redis.
+    """
+
+    def __init__(self, fallback_strategy, max_entries=REC_LOCAL_MAX_ENTRIES, ttl=REC_LOCAL_TTL):
+        self.fallback_strategy = fallback_strategy
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # {user_id: (expires_at, entry)}
+        self._lock = threading.Lock()
+
+    def _get_local(self, user_id):
+        with self._lock:
+            local = self._entries.get(user_id)
+            if not local:
+                return None
+            if local[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return local[1]
+
+    def _set_local(self, user_id, entry):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, entry)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, user_id, top_n=10):
+        touch(user_id)
+        entry = self._get_local(user_id)
+        if entry is None:
+            try:
+                entry = load(user_id)
+            except redis.RedisError as e:
+                print(f"⚠️ Recommendation cache unavailable: {e}")
+            if entry is not None:
+                self._set_local(user_id, entry)
+
+        if entry is None:
+            request_refresh(user_id)
+            return self.fallback_strategy.get_fallback_polls(top_n)
+        if is_stale(entry):
+            request_refresh(user_id)  # Serve stale now, revalidate in the background
+        return entry["recs"][:top_n]
+
+
+class RecommendationPrecomputer:
+    """
+    Background thread for the process that owns a RecommendationRefreshScheduler:
+    feeds queued users to the scheduler, and once per interval (across all
+    processes, via a Redis lock) queues stale or missing entries for recently
+    active users.
+    """
+
+    def __init__(self, scheduler, interval=REC_PRECOMPUTE_INTERVAL, poll_interval=REC_QUEUE_POLL_INTERVAL):
+        self.scheduler = scheduler
+        self.interval = interval
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="recommendation-precomputer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def drain_queue(self):
+        user_ids = redis_client.spop(REFRESH_QUEUE_KEY, REC_QUEUE_BATCH) or []
+        for user_id in user_ids:
+            self.scheduler.mark_dirty(user_id)
+        return len(user_ids)
+
+    def precompute(self):
+        # One pass per interval no matter how many consumers run; the lock just expires
+        if not redis_client.set(PRECOMPUTE_LOCK_KEY, "1", nx=True, ex=max(int(self.interval), 1)):
+            return 0
+        now = time.time()
+        redis_client.zremrangebyscore(ACTIVE_USERS_KEY, "-inf", now - REC_ACTIVE_WINDOW)
+        user_ids = redis_client.zrevrangebyscore(ACTIVE_USERS_KEY, "+inf", now - REC_ACTIVE_WINDOW,
+                                                 start=0, num=REC_PRECOMPUTE_BATCH)
+        if not user_ids:
+            return 0
+
+        pipe = redis_client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.get(cache_key(user_id))
+        due = [
+            user_id for user_id, raw in zip(user_ids, pipe.execute())
+            if raw is None or is_stale(loads(raw), now)
+        ]
+        request_refresh(*due)
+        return len(due)
+
+    def _run(self):
+        next_precompute = time.monotonic() + self.interval
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                if time.monotonic() >= next_precompute:
+                    next_precompute = time.monotonic() + self.interval
+                    self.precompute()
+                self.drain_queue()
+            except redis.RedisError as e:
+                print(f"❌ Recommendation precompute failed: {e}")
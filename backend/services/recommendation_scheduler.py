@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+RECOMMENDATION_REFRESH_INTERVAL = float(os.getenv("RECOMMENDATION_REFRESH_INTERVAL", 30))  # Min seconds between recomputes per user
+RECOMMENDATION_WORKERS = int(os.getenv("RECOMMENDATION_WORKERS", 2))  # Each worker holds its own poll index
+RECOMMENDATION_SCHEDULER_TICK = float(os.getenv("RECOMMENDATION_SCHEDULER_TICK", 0.5))  # Seconds
+
+
+def refresh_user_recommendations(user_id):
+    """
+    Worker-process entry point; each worker keeps its own models and DB connection,
+    on a read-only poll snapshot (no change stream or IDF refitter per worker).
+    """
+    from services.hybrid_recommender import HybridRecommender
+    HybridRecommender.update_recommendations(user_id, watch=False)
+    return user_id
+
+
+class RecommendationRefreshScheduler:
+    """
+    Marks users dirty on interaction events and recomputes each dirty user at
+    most once per interval on a small process pool (RECOMMENDATION_WORKERS), so
+    a burst of events from one user costs one recompute.
+    """
+
+    def __init__(self, interval=RECOMMENDATION_REFRESH_INTERVAL, workers=RECOMMENDATION_WORKERS):
+        self.interval = interval
+        self.workers = workers
+        self._dirty = set()
+        self._in_flight = set()
+        self._last_run = {}  # {user_id: monotonic time of last dispatch}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        # spawn: MongoClient is not fork-safe
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="recommendation-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+
+    def mark_dirty(self, user_id):
+        """Request a recompute for a user; repeated marks within the interval coalesce."""
+        if not user_id:
+            return
+        self.start()
+        with self._lock:
+            self._dirty.add(user_id)
+
+    def dispatch_due(self):
+        """Submit every dirty user whose last recompute is older than the interval."""
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                user_id for user_id in self._dirty
+                if user_id not in self._in_flight and now - self._last_run.get(user_id, float("-inf")) >= self.interval
+            ]
+            for user_id in due:
+                self._dirty.discard(user_id)
+                self._in_flight.add(user_id)
+                self._last_run[user_id] = now
+            # Forget users that can no longer be throttled
+            for user_id in [u for u, t in self._last_run.items() if now - t >= self.interval and u not in self._dirty]:
+                del self._last_run[user_id]
+
+        for user_id in due:
+            future = self._executor.submit(refresh_user_recommendations, user_id)
+            future.add_done_callback(lambda f, user_id=user_id: self._on_done(user_id, f))
+
+    def _on_done(self, user_id, future):
+        with self._lock:
+            self._in_flight.discard(user_id)
+        if future.exception():
+            print(f"❌ Recommendation refresh failed for user {user_id}: {future.exception()}")
+        else:
+            print(f"🎯 Recommendations updated for user {user_id}")
+
+    def _run(self):
+        while not self._stop_event.wait(RECOMMENDATION_SCHEDULER_TICK):
+            try:
+                self.dispatch_due()
+            except Exception as e:
+                print(f"❌ Recommendation scheduler error: {e}")
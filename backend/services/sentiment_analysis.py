@@ -9,33 +9,139 @@
 
 
 import asyncio
-import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
-import torch.nn.functional as F
+import os
+import threading
+import numpy as np
 
-# Load pre-trained sentiment model
+# The model is loaded on the first sentiment call, not at import time, so web
+# workers that never score a comment do not pay for torch/transformers.
 MODEL_NAME = "nlptown/bert-base-multilingual-uncased-sentiment"
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+# "torch" (fp32), "quantized" (dynamic int8 Linear layers) or "onnx" (ONNX Runtime CPU)
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "torch")
+SENTIMENT_ONNX_PATH = os.getenv("SENTIMENT_ONNX_PATH", "sentiment_model.onnx")
+SENTIMENT_MAX_LENGTH = 512
 
-# Move model to GPU if available
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model.to(device)
-model.eval()
+SENTIMENT_LABELS = ["very negative", "negative", "neutral", "positive", "very positive"]
 
-async def analyze_sentiment(text):
-    """Performs sentiment analysis asynchronously."""
-    try:
-        inputs = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512)
-        inputs = {key: val.to(device) for key, val in inputs.items()}  # Move to GPU if available
+
+class TorchSentimentBackend:
+    """BERT classifier in PyTorch, optionally with dynamic int8 quantization."""
+
+    def __init__(self, quantized=False):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+        model.eval()
+
+        if quantized:
+            # int8 kernels are CPU-only
+            self.device = torch.device("cpu")
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            # Move model to GPU if available
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model = model.to(self.device)
+
+    def predict(self, texts):
+        inputs = self.tokenizer(texts, return_tensors="pt", truncation=True, padding=True, max_length=SENTIMENT_MAX_LENGTH)
+        inputs = {key: val.to(self.device) for key, val in inputs.items()}  # Move to GPU if available
+
+        with self.torch.no_grad():
+            outputs = self.model(**inputs)
+
+        return self.torch.nn.functional.softmax(outputs.logits, dim=1).cpu().numpy()
+
+
+class OnnxSentimentBackend:
+    """BERT classifier on ONNX Runtime's CPU provider, exported from PyTorch on first use."""
+
+    def __init__(self, onnx_path=SENTIMENT_ONNX_PATH):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("SENTIMENT_BACKEND=onnx requires the onnxruntime package.")
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        if not os.path.exists(onnx_path):
+            self.export(onnx_path)
+        self.session = onnxruntime.InferenceSession(onnx_path, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+    def export(self, onnx_path):
+        """Export the PyTorch model and check it reproduces the PyTorch logits before keeping it."""
+        import onnxruntime
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+        model.eval()
+        sample = self.tokenizer(["export sample", "a longer sample, so the batch is padded"],
+                                return_tensors="pt", padding=True)
+        names = list(sample.keys())
+        tmp_path = f"{onnx_path}.tmp"
+        # A trailing dict is passed as keyword arguments, so inputs bind to forward() by name
+        torch.onnx.export(
+            model, (dict(sample),), tmp_path,
+            input_names=names, output_names=["logits"],
+            dynamic_axes={**{name: {0: "batch", 1: "sequence"} for name in names}, "logits": {0: "batch"}},
+            opset_version=14
+        )
 
         with torch.no_grad():
-            outputs = model(**inputs)
+            expected = model(**sample).logits.numpy()
+        session = onnxruntime.InferenceSession(tmp_path, providers=["CPUExecutionProvider"])
+        exported = {node.name for node in session.get_inputs()}
+        actual = session.run(["logits"], {name: sample[name].numpy() for name in names if name in exported})[0]
+        if not np.allclose(actual, expected, atol=1e-4):
+            os.remove(tmp_path)
+            raise RuntimeError("Exported sentiment model does not match the PyTorch logits.")
+
+        os.replace(tmp_path, onnx_path)
+        print(f"📦 Exported sentiment model to {onnx_path}")
+
+    def predict(self, texts):
+        inputs = self.tokenizer(texts, return_tensors="np", truncation=True, padding=True, max_length=SENTIMENT_MAX_LENGTH)
+        feeds = {name: value.astype(np.int64) for name, value in inputs.items() if name in self.input_names}
+        logits = self.session.run(["logits"], feeds)[0]
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def load_backend(name):
+    """Build a sentiment backend by name."""
+    if name == "onnx":
+        return OnnxSentimentBackend()
+    if name == "quantized":
+        return TorchSentimentBackend(quantized=True)
+    return TorchSentimentBackend()
 
-        scores = F.softmax(outputs.logits, dim=1).cpu().numpy()[0]
-        sentiment_score = scores[4] - scores[0]  # Positive - Negative
-        sentiment_label = ["very negative", "negative", "neutral", "positive", "very positive"][scores.argmax()]
 
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """Load the configured backend once per process, on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = load_backend(SENTIMENT_BACKEND)
+    return _backend
+
+def analyze_sentiment_batch(texts, backend=None):
+    """Scores a list of texts in one padded forward pass; returns [(score, label)]."""
+    scores = (backend or get_backend()).predict(texts)
+    # Positive - Negative, as a native float so it can be stored directly
+    return [(float(row[4] - row[0]), SENTIMENT_LABELS[row.argmax()]) for row in scores]
+
+async def analyze_sentiment(text):
+    """Performs sentiment analysis asynchronously."""
+    try:
+        sentiment_score, sentiment_label = (await asyncio.to_thread(analyze_sentiment_batch, [text]))[0]
         return sentiment_score, sentiment_label
 
     except Exception as e:
@@ -0,0 +1,70 @@
+"""
+Compare sentiment backends on load time, latency and memory.
+
+    python -m services.sentiment_benchmark [torch quantized onnx]
+
+Each backend runs in a fresh process so peak RSS is measured in isolation.
+"""
+import sys
+import time
+import resource
+import multiprocessing
+import numpy as np
+
+SAMPLE_TEXTS = [
+    "I love this poll, great question!",
+    "This is the worst option list I've seen.",
+    "Not sure, both answers seem fine to me.",
+    "Absolutely terrible, nobody asked for this.",
+    "Pretty good, though I would add another option.",
+]
+BATCH_SIZES = [1, 32]
+ROUNDS = 20
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+def _run_backend(name, results):
+    from services.sentiment_analysis import load_backend, analyze_sentiment_batch
+
+    baseline_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    backend = load_backend(name)
+    report = {"load_s": time.perf_counter() - start}
+
+    for batch_size in BATCH_SIZES:
+        texts = (SAMPLE_TEXTS * (batch_size // len(SAMPLE_TEXTS) + 1))[:batch_size]
+        analyze_sentiment_batch(texts, backend)  # Warm-up
+        timings = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            analyze_sentiment_batch(texts, backend)
+            timings.append((time.perf_counter() - start) * 1000)
+        report[f"batch{batch_size}_p50_ms"] = float(np.percentile(timings, 50))
+        report[f"batch{batch_size}_p95_ms"] = float(np.percentile(timings, 95))
+
+    report["rss_mb"] = _peak_rss_mb() - baseline_rss
+    results[name] = report
+
+
+def main(backends):
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Manager().dict()
+    for name in backends:
+        process = ctx.Process(target=_run_backend, args=(name, results))
+        process.start()
+        process.join()
+        if name not in results:
+            print(f"❌ Backend {name} failed (exit code {process.exitcode})")
+
+    columns = ["load_s"] + [f"batch{b}_{p}_ms" for b in BATCH_SIZES for p in ("p50", "p95")] + ["rss_mb"]
+    print("backend".ljust(12) + "".join(column.rjust(16) for column in columns))
+    for name in backends:
+        if name in results:
+            print(name.ljust(12) + "".join(f"{results[name][column]:16.1f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["torch", "quantized", "onnx"])
@@ -0,0 +1,83 @@
+import os
+import queue
+import threading
+import time
+import logging
+
+from models.Comments import Comment
+
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", 32))
+SENTIMENT_BATCH_TIMEOUT = float(os.getenv("SENTIMENT_BATCH_TIMEOUT", 0.05))  # Seconds to wait for a batch to fill
+SENTIMENT_MAX_RETRIES = 3
+
+logger = logging.getLogger(__name__)
+
+
+class SentimentWorker:
+    """
+    Queues comment texts and scores them in padded micro-batches (up to
+    SENTIMENT_BATCH_SIZE texts or SENTIMENT_BATCH_TIMEOUT seconds), writing
+    each batch back with a single bulk_write.
+    """
+
+    def __init__(self, batch_size=SENTIMENT_BATCH_SIZE, batch_timeout=SENTIMENT_BATCH_TIMEOUT):
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.comment_model = Comment()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="sentiment-worker", daemon=True)
+            self._thread.start()
+
+    def submit(self, comment_id, text):
+        """Queue a comment for sentiment scoring."""
+        self.start()
+        self._queue.put((str(comment_id), text))
+
+    def _next_batch(self):
+        batch = [self._queue.get()]  # Block until there is work
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def process_batch(self, batch):
+        """Score one batch and persist it, marking the comments as errored after retries."""
+        from services.sentiment_analysis import analyze_sentiment_batch
+
+        comment_ids = [comment_id for comment_id, _ in batch]
+        for attempt in range(1, SENTIMENT_MAX_RETRIES + 1):
+            try:
+                results = analyze_sentiment_batch([text for _, text in batch])
+                self.comment_model.bulk_update_comment_sentiments(
+                    (comment_id, score, label) for comment_id, (score, label) in zip(comment_ids, results)
+                )
+                logger.info(f"✅ Sentiment updated for {len(batch)} comments")
+                return
+            except Exception as e:
+                logger.info(f"⚠️ Attempt {attempt}: Sentiment batch of {len(batch)} failed - {e}")
+                time.sleep(2)  # Wait before retrying
+
+        try:
+            self.comment_model.bulk_update_comment_sentiments((comment_id, None, "error") for comment_id in comment_ids)
+        except Exception as e:
+            logger.info(f"❌ Failed to mark sentiment errors: {e}")
+
+    def _run(self):
+        while True:
+            self.process_batch(self._next_batch())
+
+
+sentiment_worker = SentimentWorker()
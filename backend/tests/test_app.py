@@ -62,7 +62,7 @@ def test_db_flows():
 
         # 7. Test Fetch Payments by User
         print("Fetching payments by user...")
-        payments = list(payment_model.get_payments_by_user(user_id))
+        payments, _ = payment_model.get_payments_by_user(user_id)
         assert len(payments) > 0, "Failed to fetch payments by user"
         assert payments[0]["amount"] == 10.0, "Payment data mismatch"
 
@@ -0,0 +1,20 @@
+"""
+Unit tests: pure logic only, no Mongo, Redis or Kafka.
+
+    cd backend && python -m pytest tests/unit
+
+utils.db connects (and pings Mongo) at import, so it is replaced with an
+unconnected handle before any model module is imported. Redis clients are
+created lazily and never touched unless a test swaps in its own.
+"""
+import sys
+import types
+from pathlib import Path
+from unittest.mock import MagicMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+_db = types.ModuleType("utils.db")
+_db.db_instance = MagicMock(name="db_instance")
+_db.RedisClient = MagicMock(name="RedisClient")
+sys.modules.setdefault("utils.db", _db)
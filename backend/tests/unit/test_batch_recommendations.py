@@ -0,0 +1,37 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+sparse = pytest.importorskip("scipy.sparse")
+
+from services.batch_recommendations import _top_k
+
+
+def row(values):
+    return sparse.csr_matrix(np.array([values], dtype=float)).getrow(0)
+
+
+def test_best_first():
+    assert _top_k(row([0.2, 0.9, 0, 0.5, 0.1]), 3).tolist() == [1, 3, 0]
+
+
+def test_fewer_candidates_than_k():
+    assert _top_k(row([0, 0.3, 0, 0.7]), 10).tolist() == [3, 1]
+
+
+def test_non_positive_scores_are_dropped():
+    assert _top_k(row([0.4, -0.2, 0.0, 0.6]), 4).tolist() == [3, 0]
+
+
+def test_explicit_zeros_are_dropped():
+    scores = row([0.4, 0.8, 0.6])
+    scores.data[scores.indices == 1] = 0.0  # Stored zero, e.g. after a cancelling sum
+
+    assert _top_k(scores, 3).tolist() == [2, 0]
+
+
+def test_excluded_columns_are_skipped():
+    assert _top_k(row([0.2, 0.9, 0.5, 0.7]), 2, np.array([1, 2])).tolist() == [3, 0]
+
+
+def test_empty_row():
+    assert _top_k(row([0, 0, 0]), 5).tolist() == []
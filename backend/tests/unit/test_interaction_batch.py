@@ -0,0 +1,81 @@
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from consumers.interaction_batch import InteractionBatch
+
+POLL = str(ObjectId())
+OTHER_POLL = str(ObjectId())
+
+
+def event(user_id, action_type, poll_id=POLL):
+    return {"userId": user_id, "pollId": poll_id, "actionType": action_type}
+
+
+def test_invalid_events_are_skipped():
+    batch = InteractionBatch([])
+    batch.add("poll_preferences", {"userId": "u1", "actionType": "view"})
+    batch.add("poll_preferences", event("u1", "view", poll_id="not-an-id"))
+    batch.add("user_interactions", event("unknown", "view"))  # No such user
+
+    assert batch.skipped == 3
+    assert batch.poll_operations() == []
+    assert batch.interaction_operations() == []
+
+
+def test_counters_fold_into_one_update_per_poll():
+    batch = InteractionBatch([])
+    for action_type in ("view", "view", "click"):
+        batch.add("poll_preferences", event("u1", action_type))
+    batch.add("poll_preferences", event("u1", "view", OTHER_POLL))
+
+    operations = batch.poll_operations()
+    assert len(operations) == 2
+    assert UpdateOne({"_id": ObjectId(POLL)},
+                     {"$inc": {"engagementMetrics.views": 2, "engagementMetrics.clicks": 1}}) in operations
+    assert sorted(batch.touched_polls()) == sorted([POLL, OTHER_POLL])
+
+
+def test_reactions_replay_in_event_order():
+    # like: likes += 1, dislikes = 0; then dislike: dislikes += 1, likes = 0
+    batch = InteractionBatch([])
+    batch.add("poll_preferences", event("u1", "like"))
+    batch.add("poll_preferences", event("u1", "dislike"))
+
+    assert batch.poll_operations() == [UpdateOne(
+        {"_id": ObjectId(POLL)},
+        {"$set": {"engagementMetrics.likes": 0, "engagementMetrics.dislikes": 1}}
+    )]
+
+
+def test_repeated_likes_increment():
+    batch = InteractionBatch([])
+    batch.add("poll_preferences", event("u1", "like"))
+    batch.add("poll_preferences", event("u2", "like"))
+
+    assert batch.poll_operations() == [UpdateOne(
+        {"_id": ObjectId(POLL)},
+        {"$inc": {"engagementMetrics.likes": 2}, "$set": {"engagementMetrics.dislikes": 0}}
+    )]
+
+
+def test_preferences_diff_against_the_stored_sets():
+    liked = ObjectId(POLL)
+    batch = InteractionBatch([{"piUserId": "u1", "likedPolls": [liked], "dislikedPolls": []}])
+    batch.add("poll_preferences", event("u1", "dislike"))  # Moves a liked poll back to neutral
+    batch.add("poll_preferences", event("u1", "like", OTHER_POLL))
+
+    operations = batch.user_operations()
+    assert UpdateOne({"piUserId": "u1"}, {"$pull": {"likedPolls": {"$in": [liked]}}}) in operations
+    assert UpdateOne({"piUserId": "u1"}, {"$addToSet": {"likedPolls": {"$each": [ObjectId(OTHER_POLL)]}}}) in operations
+
+
+def test_engagement_scores_follow_the_like_state():
+    batch = InteractionBatch([{"piUserId": "u1", "likedPolls": [], "dislikedPolls": [ObjectId(POLL)]}])
+    batch.add("user_interactions", event("u1", "view"))
+    batch.add("user_interactions", event("u1", "like"))  # Liking a disliked poll scores +1
+
+    state = batch.users["u1"]
+    assert state.score_change == 0.5 + 1
+    assert [entry["actionType"] for entry in state.history] == ["view", "like"]
+    assert len(batch.interaction_operations()) == 2
+    assert batch.touched_users() == ["u1"]
@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+
+from utils.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, parse_page_args
+)
+
+
+def test_datetime_cursor_round_trip():
+    document = {"_id": ObjectId(), "createdAt": datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)}
+
+    assert decode_cursor(encode_cursor(document)) == (document["createdAt"], document["_id"])
+
+
+def test_numeric_cursor_round_trip():
+    document = {"_id": ObjectId(), "engagementScore": 42.5}
+
+    assert decode_cursor(encode_cursor(document, "engagementScore")) == (42.5, document["_id"])
+
+
+def test_cursor_is_url_safe():
+    token = encode_cursor({"_id": ObjectId(), "createdAt": datetime.now(timezone.utc)})
+
+    assert not set(token) & set("+/=")
+
+
+@pytest.mark.parametrize("token", ["", "not-a-cursor", "e30", "eyJ2IjoxLCJpZCI6Inh5eiJ9"])
+def test_malformed_cursor_raises(token):
+    # e30 is {} and the last one carries an invalid ObjectId
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(token)
+
+
+def test_page_args_defaults():
+    assert parse_page_args({}) == (DEFAULT_PAGE_SIZE, None)
+    assert parse_page_args({"cursor": ""}) == (DEFAULT_PAGE_SIZE, None)
+
+
+def test_page_args_clamps_limit():
+    assert parse_page_args({"limit": "5", "cursor": "abc"}) == (5, "abc")
+    assert parse_page_args({"limit": str(MAX_PAGE_SIZE + 1)}) == (MAX_PAGE_SIZE, None)
+
+
+@pytest.mark.parametrize("limit", ["0", "-3", "ten"])
+def test_page_args_rejects_bad_limit(limit):
+    with pytest.raises(ValueError):
+        parse_page_args({"limit": limit})
@@ -0,0 +1,77 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import redis
+
+from services import recommendation_cache
+from services.recommendation_cache import REC_CACHE_FRESH, RecommendationCache
+
+FALLBACK = [{"pollId": "fallback"}]
+
+
+@pytest.fixture
+def redis_tier(monkeypatch):
+    """Replaces the Redis-backed helpers; `entries` is what load() returns per user."""
+    tier = MagicMock(entries={}, refreshed=[])
+    tier.load.side_effect = lambda user_id: tier.entries.get(user_id)
+    monkeypatch.setattr(recommendation_cache, "load", tier.load)
+    monkeypatch.setattr(recommendation_cache, "request_refresh", lambda *ids: tier.refreshed.extend(ids))
+    monkeypatch.setattr(recommendation_cache, "touch", lambda *ids: None)
+    return tier
+
+
+@pytest.fixture
+def cache():
+    fallback_strategy = MagicMock()
+    fallback_strategy.get_fallback_polls.return_value = FALLBACK
+    return RecommendationCache(fallback_strategy, max_entries=2, ttl=60)
+
+
+def entry(age, count=5):
+    return {"recs": [{"pollId": str(i)} for i in range(count)], "computedAt": time.time() - age}
+
+
+def test_miss_serves_fallback_and_queues_a_refresh(cache, redis_tier):
+    assert cache.get("u1", top_n=3) == FALLBACK
+    cache.fallback_strategy.get_fallback_polls.assert_called_once_with(3)
+    assert redis_tier.refreshed == ["u1"]
+
+
+def test_fresh_entry_is_served_without_a_refresh(cache, redis_tier):
+    redis_tier.entries["u1"] = entry(age=0)
+
+    assert [rec["pollId"] for rec in cache.get("u1", top_n=3)] == ["0", "1", "2"]
+    assert redis_tier.refreshed == []
+
+
+def test_stale_entry_is_served_and_revalidated(cache, redis_tier):
+    redis_tier.entries["u1"] = entry(age=REC_CACHE_FRESH + 1)
+
+    assert len(cache.get("u1", top_n=3)) == 3
+    assert redis_tier.refreshed == ["u1"]
+    cache.fallback_strategy.get_fallback_polls.assert_not_called()
+
+
+def test_local_tier_answers_repeat_requests(cache, redis_tier):
+    redis_tier.entries["u1"] = entry(age=0)
+    cache.get("u1")
+    cache.get("u1")
+
+    assert redis_tier.load.call_count == 1
+
+
+def test_local_tier_evicts_least_recently_used(cache, redis_tier):
+    for user_id in ("u1", "u2", "u3"):
+        redis_tier.entries[user_id] = entry(age=0)
+        cache.get(user_id)
+    cache.get("u1")
+
+    assert redis_tier.load.call_count == 4
+
+
+def test_redis_errors_fall_back(cache, redis_tier):
+    redis_tier.load.side_effect = redis.ConnectionError("down")
+
+    assert cache.get("u1") == FALLBACK
+    assert redis_tier.refreshed == ["u1"]
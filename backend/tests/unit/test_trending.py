@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis needs it to run the Lua scripts
+
+from utils import trending
+
+HL = trending.TRENDING_HALF_LIFE
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = fakeredis.FakeStrictRedis(decode_responses=True)
+    monkeypatch.setattr(trending, "redis_client", client)
+    monkeypatch.setattr(trending, "_record", client.register_script(trending.RECORD_LUA))
+    monkeypatch.setattr(trending, "_rebase", client.register_script(trending.REBASE_LUA))
+    return client
+
+
+def score(client, poll_id):
+    return client.zscore(trending.TRENDING_KEY, poll_id)
+
+
+def test_first_event_sets_the_epoch(client):
+    trending.record_engagement("p1", "vote")
+
+    assert score(client, "p1") == pytest.approx(trending.TRENDING_WEIGHTS["vote"])
+    assert float(client.get(trending.EPOCH_KEY)) == pytest.approx(time.time(), abs=5)
+
+
+def test_events_grow_with_distance_from_the_epoch(client):
+    # Same weight one half-life later counts double, i.e. the older event has halved
+    client.set(trending.EPOCH_KEY, time.time() - HL)
+    trending.record_engagement("p1", "vote")
+
+    assert score(client, "p1") == pytest.approx(2.0, rel=1e-3)
+
+
+def test_scores_accumulate_across_actions(client):
+    trending.record_engagements([("p1", "view", None), ("p1", "comment", None), ("p2", "like", None)])
+
+    assert score(client, "p1") == pytest.approx(0.1 + 1.5, rel=1e-3)
+    assert trending.get_trending(1) == ["p1"]
+
+
+def test_unknown_actions_are_ignored(client):
+    trending.record_engagements([("p1", "share", None), (None, "vote", None)])
+
+    assert client.zcard(trending.TRENDING_KEY) == 0
+    assert client.get(trending.EPOCH_KEY) is None
+
+
+def test_rebase_rescales_to_a_fresh_epoch(client):
+    epoch = time.time() - 21 * HL
+    client.set(trending.EPOCH_KEY, epoch)
+    trending.record_engagement("p1", "vote")  # Stored as ~2^21
+    client.zadd(trending.TRENDING_KEY, {"stale": 1.0})  # Recorded at the old epoch
+
+    assert trending.rebase_if_due()
+    assert score(client, "p1") == pytest.approx(1.0, rel=1e-3)
+    assert score(client, "stale") is None  # 2^-21 falls under TRENDING_MIN_SCORE
+    assert float(client.get(trending.EPOCH_KEY)) == pytest.approx(time.time(), abs=5)
+
+
+def test_rebase_waits_until_due(client):
+    client.set(trending.EPOCH_KEY, time.time() - HL)
+    trending.record_engagement("p1", "vote")
+
+    assert not trending.rebase_if_due()
+    assert score(client, "p1") == pytest.approx(2.0, rel=1e-3)
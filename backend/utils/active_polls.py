@@ -0,0 +1,115 @@
+import os
+import threading
+import redis
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+
+from utils.redis_session import redis_client
+
+# Ids of public, active, unexpired polls, kept in a Redis set so random
+# candidates are an SRANDMEMBER instead of a scan of every live poll. Writes
+# keep it current; a periodic rebuild catches polls that closed by vote limit.
+ACTIVE_POLLS_KEY = "active_polls"
+ACTIVE_POLLS_REFRESH_INTERVAL = float(os.getenv("ACTIVE_POLLS_REFRESH_INTERVAL", 300))  # Seconds
+OVERSAMPLE = 2  # Draw extra ids to cover members that closed since the last rebuild
+
+
+def active_filter(now=None):
+    return {
+        "visibility": "public",
+        "isActive": True,
+        "expiresAt": {"$gt": now or datetime.now(timezone.utc)}
+    }
+
+
+def add(*poll_ids):
+    if not poll_ids:
+        return
+    try:
+        redis_client.sadd(ACTIVE_POLLS_KEY, *[str(poll_id) for poll_id in poll_ids])
+    except redis.RedisError as e:
+        print(f"⚠️ Failed to add to active poll set: {e}")
+
+
+def remove(*poll_ids):
+    if not poll_ids:
+        return
+    try:
+        redis_client.srem(ACTIVE_POLLS_KEY, *[str(poll_id) for poll_id in poll_ids])
+    except redis.RedisError as e:
+        print(f"⚠️ Failed to remove from active poll set: {e}")
+
+
+def sample(collection, count):
+    """
+    Return up to `count` random active poll ids. Costs one SRANDMEMBER and one
+    `_id` lookup regardless of how many polls are live; falls back to an indexed
+    $match + $sample when the set is empty or Redis is unavailable.
+    """
+    if count <= 0:
+        return []
+    try:
+        candidates = redis_client.srandmember(ACTIVE_POLLS_KEY, count * OVERSAMPLE)
+    except redis.RedisError as e:
+        print(f"⚠️ Active poll set unavailable, sampling in Mongo: {e}")
+        candidates = []
+
+    if not candidates:
+        pipeline = [{"$match": active_filter()}, {"$sample": {"size": count}}, {"$project": {"_id": 1}}]
+        return [str(poll["_id"]) for poll in collection.aggregate(pipeline)]
+
+    query = {**active_filter(), "_id": {"$in": [ObjectId(poll_id) for poll_id in candidates]}}
+    still_active = {str(poll["_id"]) for poll in collection.find(query, {"_id": 1})}
+    closed = [poll_id for poll_id in candidates if poll_id not in still_active]
+    remove(*closed)
+    return [poll_id for poll_id in candidates if poll_id in still_active][:count]
+
+
+def rebuild(collection):
+    """Replace the set with the current active polls in one atomic RENAME."""
+    staging_key = f"{ACTIVE_POLLS_KEY}:rebuild"
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(staging_key)
+    poll_ids = [str(poll["_id"]) for poll in collection.find(active_filter(), {"_id": 1})]
+    for start in range(0, len(poll_ids), 1000):
+        pipe.sadd(staging_key, *poll_ids[start:start + 1000])
+    if poll_ids:
+        pipe.rename(staging_key, ACTIVE_POLLS_KEY)
+    else:
+        pipe.delete(ACTIVE_POLLS_KEY)
+    pipe.execute()
+    return len(poll_ids)
+
+
+class ActivePollsRefresher:
+    """Background thread that rebuilds the active poll set on start and then periodically."""
+
+    def __init__(self, collection, interval=ACTIVE_POLLS_REFRESH_INTERVAL):
+        self.collection = collection
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="active-polls-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def refresh(self):
+        try:
+            rebuild(self.collection)
+        except (redis.RedisError, PyMongoError) as e:
+            print(f"❌ Active poll set rebuild failed: {e}")
+
+    def _run(self):
+        self.refresh()
+        while not self._stop_event.wait(self.interval):
+            self.refresh()
@@ -1,11 +1,72 @@
 import os
+import json
+import hashlib
+import threading
 from pymongo import MongoClient, ASCENDING
-from pymongo.errors import ConnectionFailure, PyMongoError
+from pymongo.errors import ConnectionFailure, PyMongoError, OperationFailure
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Declarative index manifest: {collection: [(keys, options)]}. A key is a field
+# name (ascending) or a (field, direction) tuple.
+INDEX_MANIFEST = {
+    "users": [
+        (["piUserId"], {"unique": True})
+    ],
+    "comments": [
+        (["pollId"], {}),
+        (["userId"], {}),
+        (["createdAt"], {}),
+        (["pollId", "createdAt", "_id"], {}),  # Comment thread pages
+    ],
+    "notifications": [
+        (["userId"], {}),
+        (["createdAt"], {}),
+        (["userId", "createdAt", "_id"], {}),  # Notification pages
+        (["relatedEntityId"], {}),
+    ],
+    "payments": [
+        (["userId"], {}),
+        (["pollId"], {}),
+        (["createdAt"], {}),
+        (["userId", "createdAt", "_id"], {}),  # Payment history pages
+        (["pollId", "createdAt", "_id"], {}),
+    ],
+    "polls": [
+        (["createdBy"], {}),
+        (["createdAt"], {}),
+        (["expiresAt"], {}),
+        # Feed pages: equality fields, then the (createdAt, _id) sort, then the expiry range
+        (["visibility", "isActive", "createdAt", "_id", "expiresAt"], {}),  # Active feed
+        (["topics", "visibility", "isActive", "createdAt", "_id", "expiresAt"], {}),  # Topic feeds
+    ],
+    "interactions": [
+        (["pollId"], {}),
+        (["userId"], {}),
+        (["userId", "timestamp", "_id"], {}),  # History pages
+        (["pollId", "timestamp", "_id"], {}),
+        (["actionType", "timestamp", "_id"], {}),
+    ],
+    "votes": [
+        (["pollId", "userId"], {"unique": True}),
+        (["userId"], {}),
+    ]
+}
+
+SCHEMA_META_COLLECTION = "_schema_meta"  # Records which manifest version each collection has
+
+
+def _index_keys(keys):
+    """Convert manifest keys to pymongo's [(field, direction)] format."""
+    return [key if isinstance(key, tuple) else (key, ASCENDING) for key in keys]
+
+
+def _manifest_hash(collection_name):
+    entries = [(_index_keys(keys), options) for keys, options in INDEX_MANIFEST.get(collection_name, [])]
+    return hashlib.sha1(json.dumps(entries, sort_keys=True).encode("utf-8")).hexdigest()
+
 class Database:
     _instance = None  # Singleton instance
 
@@ -33,6 +94,8 @@ class Database:
 
         self.client = None
         self.db = None
+        self._collections = {}  # Cached collection handles, indexed once per process
+        self._collections_lock = threading.Lock()
 
     def connect(self):
         """
@@ -58,54 +121,69 @@ class Database:
         :param collection_name: Name of the collection
         :return: MongoDB Collection object
         """
+        collection = self._collections.get(collection_name)
+        if collection is not None:
+            return collection
         try:
             if self.db is None:
                 raise Exception("Database connection is not established.")
-            collection = self.db[collection_name]
-            self.ensure_indexes(collection_name, collection)  # Ensure indexes on collection
-            return collection
+            with self._collections_lock:
+                if collection_name not in self._collections:
+                    collection = self.db[collection_name]
+                    self.ensure_indexes(collection_name, collection)  # Once per process
+                    self._collections[collection_name] = collection
+            return self._collections[collection_name]
         except Exception as e:
             print(f"Error retrieving collection {collection_name}: {e}")
             raise
 
-    def ensure_indexes(self, collection_name, collection):
+    def ensure_indexes(self, collection_name, collection, force=False):
+        """
+        Apply the manifest indexes for a collection, unless this deployment
+        already applied the same manifest version.
         """
-        Define and create indexes based on collection names.
+        if collection_name not in INDEX_MANIFEST:
+            return
+        manifest_hash = _manifest_hash(collection_name)
+        meta = self.db[SCHEMA_META_COLLECTION]
+        if not force and meta.find_one({"_id": f"indexes:{collection_name}", "hash": manifest_hash}):
+            return
+
+        for keys, options in INDEX_MANIFEST[collection_name]:
+            collection.create_index(_index_keys(keys), **options)
+        meta.update_one({"_id": f"indexes:{collection_name}"}, {"$set": {"hash": manifest_hash}}, upsert=True)
+        print(f"Indexes ensured for {collection_name}")
+
+    def apply_index_manifest(self):
+        """Apply every manifest entry now (e.g. from a deploy step)."""
+        for collection_name in INDEX_MANIFEST:
+            self.ensure_indexes(collection_name, self.db[collection_name], force=True)
+
+    def report_indexes(self):
         """
-        index_definitions = {
-            "users": [
-                (["piUserId"], {"unique": True})
-            ],
-            "comments": [
-                (["pollId"], {}),
-                (["userId"], {}),
-                (["createdAt"], {}),
-            ],
-            "notifications": [
-                (["userId"], {}),
-                (["createdAt"], {}),
-                (["relatedEntityId"], {}),
-            ],
-            "payments": [
-                (["userId"], {}),
-                (["pollId"], {}),
-                (["createdAt"], {}),
-            ],
-            "polls": [
-                (["createdBy"], {}),
-                (["createdAt"], {}),
-                (["expiresAt"], {}),
-            ],
-            "interactions": [
-                (["pollId"], {}),
-                (["userId"], {}),
-            ]
-        }
-        if collection_name in index_definitions:
-            for keys, options in index_definitions[collection_name]:
-                index_keys = [(key, ASCENDING) for key in keys]  # Convert to tuple format
-                collection.create_index(index_keys, **options)
-            print(f"Indexes ensured for {collection_name}")
+        Compare live indexes with the manifest.
+
+        :return: {collection: {"missing": [...], "unmanaged": [...], "unused": [...]}}
+        """
+        report = {}
+        for collection_name, entries in INDEX_MANIFEST.items():
+            collection = self.db[collection_name]
+            live = {name: [list(k) for k in info["key"]] for name, info in collection.index_information().items()}
+            live_keys = list(live.values())
+            expected = [[list(k) for k in _index_keys(keys)] for keys, _ in entries]
+
+            try:
+                stats = collection.aggregate([{"$indexStats": {}}])
+                unused = [stat["name"] for stat in stats if stat["accesses"]["ops"] == 0 and stat["name"] != "_id_"]
+            except OperationFailure:
+                unused = []  # $indexStats needs clusterMonitor privileges
+
+            report[collection_name] = {
+                "missing": [keys for keys in expected if keys not in live_keys],
+                "unmanaged": [name for name, key in live.items() if name != "_id_" and key not in expected],
+                "unused": unused,
+            }
+        return report
 
     def close(self):
         try:
@@ -142,4 +220,10 @@ class RedisClient:
 
     def get_client(self):
         return self.redis
-    
\ No newline at end of file
+    
+
+# Apply the index manifest and report drift: python -m utils.db
+if __name__ == "__main__":
+    db_instance.apply_index_manifest()
+    for collection_name, findings in db_instance.report_indexes().items():
+        print(f"{collection_name}: {findings}")
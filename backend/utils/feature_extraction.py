@@ -1,18 +1,161 @@
+import os
+import threading
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer  # ✅ Correct package name
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from pymongo import UpdateOne
+
+# Every poll is hashed into the same fixed-width space, so vectors stored at
+# create/update time stay comparable across polls and processes. Stored
+# vectors hold raw term counts; IDF weighting is applied at scoring time so a
+# refit never requires rewriting the stored vectors.
+FEATURE_DIM = int(os.getenv("FEATURE_DIM", 2 ** 18))
+FEATURE_REFIT_INTERVAL = float(os.getenv("FEATURE_REFIT_INTERVAL", 600))  # Seconds
+
+_hasher = HashingVectorizer(n_features=FEATURE_DIM, alternate_sign=False, norm=None)
+
+
+def poll_text(poll):
+    """Concatenate the text fields a poll is described by."""
+    text_data = [poll.get("title") or "", poll.get("description") or ""]
+    text_data.extend(poll.get("topics") or [])
+    return " ".join(text_data)
+
+
+def text_to_vector(text):
+    """Hash free text into a sparse {"indices", "values"} term-count vector."""
+    row = _hasher.transform([text or ""])
+    return {"indices": row.indices.tolist(), "values": row.data.tolist()}
+
 
 def get_feature_vector(poll):
     """
-    Converts poll text data into a numerical feature vector using TF-IDF.
+    Converts poll text data into a fixed-width sparse term-count vector.
     """
     if not poll or not isinstance(poll, dict):
-        return []
-    
-    text_data = [poll.get("title", ""), poll.get("description", "")]
-    topics = poll.get("topics", [])
-    text_data.extend(topics)
-
-    vectorizer = TfidfVectorizer()
-    vector = vectorizer.fit_transform([" ".join(text_data)])
-    
-    return vector.toarray().flatten().tolist()  # Convert sparse matrix to dense list
+        return None
+    return text_to_vector(poll_text(poll))
+
+
+def vectors_to_matrix(vectors):
+    """Stack stored sparse vectors into an (n, FEATURE_DIM) CSR matrix."""
+    indptr = [0]
+    indices = []
+    values = []
+    for vector in vectors:
+        vector = vector or {}
+        indices.extend(vector.get("indices", []))
+        values.extend(vector.get("values", []))
+        indptr.append(len(indices))
+    return csr_matrix(
+        (np.asarray(values, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(vectors), FEATURE_DIM)
+    )
+
+
+class IdfModel:
+    """Document frequencies over the poll corpus, shared by all CBF scoring."""
+
+    def __init__(self):
+        self.doc_freq = np.zeros(FEATURE_DIM, dtype=np.float32)
+        self.num_docs = 0
+        self.version = 0  # Bumped on every change, so cached IDF-weighted matrices can tell they are stale
+        self._lock = threading.Lock()
+
+    def fit(self, vectors):
+        """Recompute document frequencies from a full pass over stored vectors."""
+        doc_freq = np.zeros(FEATURE_DIM, dtype=np.float32)
+        num_docs = 0
+        for vector in vectors:
+            if vector and vector.get("indices"):
+                doc_freq[np.asarray(vector["indices"])] += 1
+                num_docs += 1
+        with self._lock:
+            self.doc_freq, self.num_docs = doc_freq, num_docs
+            self.version += 1
+
+    def partial_fit(self, vector):
+        """Fold one newly stored vector into the document frequencies."""
+        if vector and vector.get("indices"):
+            with self._lock:
+                self.doc_freq[np.asarray(vector["indices"])] += 1
+                self.num_docs += 1
+                self.version += 1
+
+    def idf(self):
+        with self._lock:
+            return np.log((1 + self.num_docs) / (1 + self.doc_freq)) + 1
+
+    def transform(self, matrix):
+        """Apply IDF weights and L2-normalise rows, giving cosine-ready vectors."""
+        return normalize(matrix.multiply(self.idf()).tocsr(), norm="l2", copy=False)
+
+
+idf_model = IdfModel()
+
+
+def fit_idf(collection):
+    """Fit the shared IDF model on every stored poll vector (read-only)."""
+    idf_model.fit(
+        poll.get("featureVector")
+        for poll in collection.find({"featureVector": {"$ne": None}}, {"featureVector": 1})
+    )
+
+
+class FeatureRefitter:
+    """Background job: backfill missing poll vectors and refit IDF periodically."""
+
+    def __init__(self, collection, interval=FEATURE_REFIT_INTERVAL):
+        self.collection = collection
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="feature-refitter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def backfill(self, batch_size=500):
+        """Store vectors for polls created before vectors were persisted."""
+        operations = []
+        for poll in self.collection.find(
+            {"featureVector": None}, {"title": 1, "description": 1, "topics": 1}
+        ):
+            operations.append(UpdateOne({"_id": poll["_id"]}, {"$set": {"featureVector": get_feature_vector(poll)}}))
+            if len(operations) >= batch_size:
+                self.collection.bulk_write(operations, ordered=False)
+                operations = []
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+
+    def refit(self):
+        self.backfill()
+        fit_idf(self.collection)
+        print(f"📐 Feature IDF refit over {idf_model.num_docs} polls")
+
+    def _run(self):
+        while True:
+            try:
+                self.refit()
+            except Exception as e:
+                print(f"❌ Feature refit failed: {e}")
+            if self._stop_event.wait(self.interval):
+                return
+
+
+_refitter = None
+
+
+def start_feature_refitter(collection):
+    """Start the shared refitter once per process."""
+    global _refitter
+    if _refitter is None:
+        _refitter = FeatureRefitter(collection)
+        _refitter.start()
+    return _refitter
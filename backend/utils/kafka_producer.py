@@ -1,23 +1,140 @@
 from kafka import KafkaProducer
+from kafka.errors import KafkaTimeoutError
+from collections import deque
 import json
+import os
+import threading
+import time
+
+# "sync" flushes after every send; "async" batches in the background and
+# never blocks the caller on a broker round trip.
+KAFKA_PRODUCER_MODE = os.getenv("KAFKA_PRODUCER_MODE", "sync")
+KAFKA_LINGER_MS = int(os.getenv("KAFKA_LINGER_MS", 5))
+KAFKA_BATCH_SIZE = int(os.getenv("KAFKA_BATCH_SIZE", 64 * 1024))  # Bytes per partition batch
+KAFKA_COMPRESSION = os.getenv("KAFKA_COMPRESSION", "gzip")
+KAFKA_SPILL_BUFFER_SIZE = int(os.getenv("KAFKA_SPILL_BUFFER_SIZE", 10000))  # Messages held while the broker is slow
+KAFKA_SPILL_RETRY_INTERVAL = float(os.getenv("KAFKA_SPILL_RETRY_INTERVAL", 1.0))  # Seconds
+
 
 class KafkaProducerInstance:
     """Kafka Producer for sending events."""
-    def __init__(self, bootstrap_servers="localhost:9092"):
+    def __init__(self, bootstrap_servers="localhost:9092", mode=KAFKA_PRODUCER_MODE):
         self.bootstrap_servers = bootstrap_servers
+        self.mode = mode
+        producer_options = {}
+        if mode == "async":
+            producer_options = {
+                "linger_ms": KAFKA_LINGER_MS,
+                "batch_size": KAFKA_BATCH_SIZE,
+                "compression_type": KAFKA_COMPRESSION,
+                "acks": 1,
+                "max_block_ms": 0  # Never wait for buffer space; spill locally instead
+            }
         self.producer = KafkaProducer(
             bootstrap_servers=self.bootstrap_servers,
-            value_serializer=lambda v: json.dumps(v).encode('utf-8')
+            value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+            key_serializer=lambda k: str(k).encode('utf-8') if k is not None else None,  # Unkeyed messages stay unkeyed
+            **producer_options
         )
 
-    def send_message(self, topic, message):
-        """Send a message to the Kafka topic."""
+        self.metrics = {"sent": 0, "delivered": 0, "failed": 0, "spilled": 0, "dropped": 0}
+        self._metrics_lock = threading.Lock()
+        self._spill = deque()  # Bounded below by KAFKA_SPILL_BUFFER_SIZE
+        self._spill_lock = threading.Lock()
+        self._spill_thread = None
+
+    def send_message(self, topic, message, key=None):
+        """Send a message to the Kafka topic; messages with the same key keep their order."""
+        if self.mode == "async":
+            self.send_async(topic, message, key)
+            return
         try:
-            self.producer.send(topic, message)
+            self.producer.send(topic, message, key=key)
             self.producer.flush()  # Ensure message is sent immediately
             print(f"✅ Message sent to topic '{topic}': {message}")
         except Exception as e:
             print(f"❌ Kafka Producer Error: {e}")
 
+    def send_async(self, topic, message, key=None):
+        """Hand a message to the producer's batching buffer without waiting for the broker."""
+        with self._spill_lock:
+            if self._spill:
+                self._spill_locked(topic, message, key)  # Keep ordering behind already spilled messages
+                return
+        try:
+            future = self.producer.send(topic, message, key=key)
+        except KafkaTimeoutError:
+            self._spill_message(topic, message, key)  # Producer buffer is full
+            return
+        except Exception as e:
+            self._record("failed")
+            print(f"❌ Kafka Producer Error: {e}")
+            return
+        self._record("sent")
+        future.add_callback(self._on_delivery).add_errback(self._on_error)
+
+    def _record(self, metric, count=1):
+        with self._metrics_lock:
+            self.metrics[metric] += count
+
+    def _on_delivery(self, record_metadata):
+        self._record("delivered")
+
+    def _on_error(self, exc):
+        self._record("failed")
+        print(f"❌ Kafka delivery failed: {exc}")
+
+    def _spill_message(self, topic, message, key=None):
+        with self._spill_lock:
+            self._spill_locked(topic, message, key)
+
+    def _spill_locked(self, topic, message, key):
+        """Buffer a message; the caller holds _spill_lock."""
+        if len(self._spill) >= KAFKA_SPILL_BUFFER_SIZE:
+            self._spill.popleft()  # Drop the oldest event rather than block the request
+            self._record("dropped")
+        self._spill.append((topic, message, key))
+        self._record("spilled")
+        # The drain thread clears _spill_thread under the lock as it exits, so None is exact
+        if self._spill_thread is None:
+            self._spill_thread = threading.Thread(target=self._drain_spill, name="kafka-spill", daemon=True)
+            self._spill_thread.start()
+
+    def _drain_spill(self):
+        """Replay spilled messages once the producer accepts sends again."""
+        while True:
+            with self._spill_lock:
+                if not self._spill:
+                    self._spill_thread = None
+                    return
+                topic, message, key = self._spill[0]
+                try:
+                    future = self.producer.send(topic, message, key=key)
+                except KafkaTimeoutError:
+                    future = None
+                except Exception as e:
+                    # Not retryable (e.g. unserializable): drop it so it cannot stall the queue
+                    self._spill.popleft()
+                    self._record("failed")
+                    print(f"❌ Kafka Producer Error: {e}")
+                    continue
+                if future is not None:
+                    self._spill.popleft()
+            if future is None:
+                time.sleep(KAFKA_SPILL_RETRY_INTERVAL)
+                continue
+            self._record("sent")
+            future.add_callback(self._on_delivery).add_errback(self._on_error)
+
+    def get_metrics(self):
+        """Snapshot of producer counters plus the current spill buffer depth."""
+        with self._metrics_lock:
+            return {**self.metrics, "spill_buffer": len(self._spill)}
+
+    def close(self, timeout=10):
+        """Flush buffered messages before shutdown."""
+        self.producer.flush(timeout=timeout)
+        self.producer.close(timeout=timeout)
+
 # Singleton instance
 kafka_producer = KafkaProducerInstance()
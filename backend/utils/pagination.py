@@ -0,0 +1,79 @@
+import os
+import json
+import base64
+import binascii
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING
+
+# Page sizes for list endpoints; clients may ask for less than the max, never more
+DEFAULT_PAGE_SIZE = int(os.getenv("PAGE_SIZE_DEFAULT", 20))
+MAX_PAGE_SIZE = int(os.getenv("PAGE_SIZE_MAX", 100))
+
+
+def encode_cursor(document, sort_field="createdAt"):
+    """Build an opaque token from the (sort_field, _id) position of the last document on a page."""
+    value = document.get(sort_field)
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    payload = json.dumps({"v": value, "id": str(document["_id"])}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Return the (sort value, ObjectId) pair stored in a cursor token. Raises ValueError if it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value = payload["v"]
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$date"])
+        return value, ObjectId(payload["id"])
+    except (binascii.Error, UnicodeError, KeyError, TypeError, ValueError, InvalidId):
+        raise ValueError("Invalid cursor")
+
+
+def parse_page_args(args):
+    """Read `limit` and `cursor` from request args, clamping the page size. Raises ValueError on bad input."""
+    try:
+        page_size = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if page_size < 1:
+        raise ValueError("limit must be positive")
+    return min(page_size, MAX_PAGE_SIZE), args.get("cursor") or None
+
+
+def paginate(collection, query, sort_field="createdAt", page_size=None, cursor=None, projection=None):
+    """
+    Fetch one page of `query`, newest first, using keyset pagination on (sort_field, _id).
+
+    Each page is a bounded index range scan starting right after the cursor, so the cost
+    doesn't grow with how deep the client has paged. Needs an index ending in sort_field
+    after the query's equality fields.
+
+    :return: (documents, next_cursor) where next_cursor is None on the last page
+    """
+    page_size = min(page_size or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+    query = dict(query)
+    if projection:
+        projection = {**projection, sort_field: 1}  # The next cursor is built from it
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        after = {"$or": [
+            {sort_field: {"$lt": value}},
+            {sort_field: value, "_id": {"$lt": last_id}}
+        ]}
+        query = {"$and": [query, after]} if query else after
+
+    documents = list(
+        collection.find(query, projection)
+        .sort([(sort_field, DESCENDING), ("_id", DESCENDING)])
+        .limit(page_size + 1)  # One extra to tell whether another page exists
+    )
+    next_cursor = None
+    if len(documents) > page_size:
+        documents = documents[:page_size]
+        next_cursor = encode_cursor(documents[-1], sort_field)
+    return documents, next_cursor
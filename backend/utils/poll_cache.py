@@ -0,0 +1,108 @@
+import os
+import time
+import uuid
+import redis
+
+from utils.redis_session import redis_client
+from utils.json_encoder import dumps, loads
+
+# Read-through cache for single-poll reads. Every poll has a version counter;
+# cached entries are tagged with the version they were loaded under, and any
+# write bumps the version, so a reader never accepts an entry older than the
+# last write, even one filled by a loader that raced the write.
+POLL_CACHE_TTL_MS = int(float(os.getenv("POLL_CACHE_TTL", 15)) * 1000)  # 0 disables the cache
+POLL_CACHE_LOCK_MS = int(os.getenv("POLL_CACHE_LOCK_MS", 2000))  # Max time one loader holds a miss
+POLL_CACHE_WAIT_MS = int(os.getenv("POLL_CACHE_WAIT_MS", 25))  # Poll interval while another worker loads
+POLL_VERSION_TTL = 24 * 3600  # Outlives any entry, so versions never go backwards under a live entry
+
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+_release_lock = redis_client.register_script(RELEASE_LOCK_LUA)
+
+
+def version_key(poll_id):
+    return f"poll_cache:ver:{poll_id}"
+
+
+def entry_key(poll_id, view):
+    return f"poll_cache:{poll_id}:{view}"
+
+
+def lock_key(poll_id, view):
+    return f"poll_cache:lock:{poll_id}:{view}"
+
+
+def _read(poll_id, view):
+    """Return (version, cached document or None) in one round trip."""
+    version, raw = redis_client.mget(version_key(poll_id), entry_key(poll_id, view))
+    version = version or "0"
+    if raw:
+        entry = loads(raw)
+        if entry["v"] == version:
+            return version, entry["doc"]
+    return version, None
+
+
+def _fill(poll_id, view, version, document):
+    payload = dumps({"v": version, "doc": document})
+    redis_client.set(entry_key(poll_id, view), payload, px=POLL_CACHE_TTL_MS)
+    # Hand back the decoded form so hits and misses return identical shapes
+    return loads(payload)["doc"]
+
+
+def get_or_load(poll_id, view, loader):
+    """
+    Return the cached `view` of a poll, calling `loader()` on a miss.
+
+    Only one worker loads a given miss; the others wait for its fill for up to
+    POLL_CACHE_LOCK_MS and then fall back to loading themselves. Redis errors
+    fall through to the loader so the cache can never take reads down.
+    """
+    if POLL_CACHE_TTL_MS <= 0:
+        return loader()
+    poll_id = str(poll_id)
+    try:
+        version, document = _read(poll_id, view)
+        if document is not None:
+            return document
+
+        token = uuid.uuid4().hex
+        if not redis_client.set(lock_key(poll_id, view), token, nx=True, px=POLL_CACHE_LOCK_MS):
+            deadline = time.monotonic() + POLL_CACHE_LOCK_MS / 1000
+            while time.monotonic() < deadline:
+                time.sleep(POLL_CACHE_WAIT_MS / 1000)
+                version, document = _read(poll_id, view)
+                if document is not None:
+                    return document
+            return loader()
+
+        try:
+            document = loader()
+            return _fill(poll_id, view, version, document) if document is not None else None
+        finally:
+            _release_lock(keys=[lock_key(poll_id, view)], args=[token])
+    except redis.RedisError as e:
+        print(f"⚠️ Poll cache unavailable, reading from Mongo: {e}")
+        return loader()
+
+
+def invalidate(*poll_ids):
+    """
+    Bump the version of each poll so every cached view of it is ignored from now on.
+    Writes made inside a transaction should invalidate again after the commit, since
+    a reader can refill the cache from the pre-commit document in between.
+    """
+    if not poll_ids:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for poll_id in poll_ids:
+            pipe.incr(version_key(str(poll_id)))
+            pipe.expire(version_key(str(poll_id)), POLL_VERSION_TTL)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"⚠️ Failed to invalidate poll cache: {e}")
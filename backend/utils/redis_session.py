@@ -4,6 +4,9 @@ from datetime import timedelta
 from dotenv import load_dotenv
 import logging
 import json
+import threading
+import time
+from collections import OrderedDict
 
 # Load environment variables
 load_dotenv()
@@ -14,6 +17,9 @@ REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
 REDIS_DB = int(os.getenv('REDIS_DB', 0))
 REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', None)
 REDIS_SESSION_TIMEOUT = int(os.getenv('REDIS_SESSION_TIMEOUT', 3600))  # Timeout in seconds
+SESSION_CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', 30))  # Seconds a decoded session stays in-process
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv('SESSION_CACHE_MAX_ENTRIES', 10000))
+SESSION_INVALIDATION_CHANNEL = "app_session:invalidate"
 
 # Redis client initialization
 redis_client = redis.StrictRedis(
@@ -23,39 +29,108 @@ redis_client = redis.StrictRedis(
     decode_responses=True
 )
 
+class SessionCache:
+    """
+    Bounded LRU/TTL cache of decoded sessions for this worker process.
+    Entries are dropped when any worker publishes a delete on the
+    invalidation channel.
+    """
+
+    def __init__(self, max_entries=SESSION_CACHE_MAX_ENTRIES, ttl=SESSION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # {session_id: (expires_at, session_data)}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if not entry:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return entry[1]
+
+    def set(self, session_id, session_data, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[session_id] = (time.monotonic() + ttl, session_data)
+            self._entries.move_to_end(session_id)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def start_listener(self):
+        """Subscribe to session invalidations published by delete_session."""
+        if self._listener or self.ttl <= 0:
+            return
+        with self._listener_lock:  # Concurrent first misses must not each subscribe
+            if self._listener:
+                return
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{SESSION_INVALIDATION_CHANNEL: lambda message: self.invalidate(message["data"])})
+            self._listener = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+
+session_cache = SessionCache()
+
 # Helper functions for session management
 
 def create_session(session_id, session_data, expiry=1800):
     """Store session data in Redis."""
     logging.info(f"Creating session for {session_id} with data: {session_data}")
     redis_client.setex(f"app_session:{session_id}", expiry, json.dumps(session_data))
+    session_cache.invalidate(session_id)
 
 
 def get_session(session_id):
     """
-    Retrieve session details for a user from Redis.
+    Retrieve session details for a user, from the in-process cache or Redis.
     :param user_id: ID of the user.
     :return: The session data (dict) if it exists, else None.
     """
-    #logging.info(f"Retrieving session for {session_id} from Redis")
-    session_data = redis_client.get(f"app_session:{session_id}")
-    if not session_data:
+    session_data = session_cache.get(session_id)
+    if session_data is not None:
+        return session_data
+
+    # Single round trip: the value and its remaining TTL
+    session_cache.start_listener()
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.get(f"app_session:{session_id}")
+    pipe.pttl(f"app_session:{session_id}")
+    raw_session, ttl_ms = pipe.execute()
+    if not raw_session:
         logging.error(f"Session key app_session:{session_id} not found in Redis")
         return None
 
     try:
-        return json.loads(session_data)
+        session_data = json.loads(raw_session)
     except json.JSONDecodeError as e:
         logging.error(f"Failed to decode session data: {e}")
         return None
 
+    # Never cache past the Redis expiry (-1 means no expiry)
+    session_cache.set(session_id, session_data, ttl_ms / 1000 if ttl_ms >= 0 else None)
+    return session_data
+
 
 def delete_session(session_id):
     """
-    Delete the Redis session for the user.
+    Delete the Redis session for the user and evict it from every worker's cache.
     :param user_id: ID of the user.
     """
     redis_client.delete(f"app_session:{session_id}")
+    session_cache.invalidate(session_id)
+    redis_client.publish(SESSION_INVALIDATION_CHANNEL, session_id)
     logging.info(f"Session {session_id} deleted from Redis")
 
 
@@ -83,18 +158,3 @@ def redis_health_check():
     except redis.ConnectionError as e:
         print(f"Redis connection failed: {e}")
         return False
-
-# Helper functions for recommendation caching
-
-def cache_recommendations(user_id, recommendations, expiry=3600):
-    """Stores user recommendations in Redis with an expiry time."""
-    redis_client.setex(f"recs:{user_id}", expiry, json.dumps(recommendations))
-
-def get_cached_recommendations(user_id):
-    """Fetches cached recommendations for a user from Redis."""
-    cached_recs = redis_client.get(f"recs:{user_id}")
-    return json.loads(cached_recs) if cached_recs else None
-
-def delete_cached_recommendations(user_id):
-    """Deletes cached recommendations for a user (useful when updating)."""
-    redis_client.delete(f"recs:{user_id}")
@@ -0,0 +1,195 @@
+import os
+import time
+import threading
+import redis
+from datetime import datetime, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import PyMongoError
+
+from utils.redis_session import redis_client
+
+# Trending scores use forward decay: an event at time t adds
+# weight * 2^((t - epoch) / half_life), so older events shrink relative to new
+# ones without ever rewriting stored scores. The maintainer periodically
+# rescales every set to a fresh epoch before the exponent gets large.
+TRENDING_HALF_LIFE = float(os.getenv("TRENDING_HALF_LIFE_HOURS", 6)) * 3600  # Seconds
+TRENDING_REBASE_AFTER = TRENDING_HALF_LIFE * 20
+TRENDING_MIN_SCORE = float(os.getenv("TRENDING_MIN_SCORE", 0.01))  # Dropped as decayed-out on rebase
+TRENDING_MAX_ENTRIES = int(os.getenv("TRENDING_MAX_ENTRIES", 10000))  # Per set
+TRENDING_MAINTAIN_INTERVAL = float(os.getenv("TRENDING_MAINTAIN_INTERVAL", 60))  # Seconds
+TRENDING_BY_TOPIC = os.getenv("TRENDING_BY_TOPIC", "false").lower() == "true"
+
+TRENDING_WEIGHTS = {"view": 0.1, "click": 0.25, "like": 0.75, "vote": 1.0, "comment": 1.5}
+
+TRENDING_KEY = "trending:polls"
+TOPIC_KEYS_SET = "trending:topic_keys"  # Every per-topic set, so maintenance can reach them
+EPOCH_KEY = "trending:epoch"
+
+# KEYS: epoch, topic registry, global set, topic sets...  ARGV: poll id, weight, half-life
+RECORD_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local epoch = tonumber(redis.call('GET', KEYS[1]))
+if not epoch then
+    epoch = now
+    redis.call('SET', KEYS[1], tostring(now))
+end
+local increment = tonumber(ARGV[2]) * math.pow(2, (now - epoch) / tonumber(ARGV[3]))
+for i = 3, #KEYS do
+    redis.call('ZINCRBY', KEYS[i], increment, ARGV[1])
+    if i > 3 then
+        redis.call('SADD', KEYS[2], KEYS[i])
+    end
+end
+return tostring(increment)
+"""
+
+# KEYS: epoch, topic registry, global set  ARGV: half-life, min score
+REBASE_LUA = """
+local epoch = tonumber(redis.call('GET', KEYS[1]))
+if not epoch then
+    return 0
+end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local factor = math.pow(2, -(now - epoch) / tonumber(ARGV[1]))
+local keys = redis.call('SMEMBERS', KEYS[2])
+table.insert(keys, KEYS[3])
+for _, key in ipairs(keys) do
+    redis.call('ZUNIONSTORE', key, 1, key, 'WEIGHTS', factor)
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', '(' .. ARGV[2])
+end
+redis.call('SET', KEYS[1], tostring(now))
+return 1
+"""
+
+_record = redis_client.register_script(RECORD_LUA)
+_rebase = redis_client.register_script(REBASE_LUA)
+
+
+def topic_key(topic):
+    return f"trending:topic:{topic}"
+
+
+def _record_keys(topics):
+    keys = [EPOCH_KEY, TOPIC_KEYS_SET, TRENDING_KEY]
+    if TRENDING_BY_TOPIC:
+        keys.extend(topic_key(topic) for topic in topics or [])
+    return keys
+
+
+def record_engagement(poll_id, action_type, topics=None):
+    """Add a decayed engagement event to the poll's trending score(s). Never raises on Redis errors."""
+    record_engagements([(poll_id, action_type, topics)])
+
+
+def record_engagements(events):
+    """Record many (poll_id, action_type, topics) events in one pipelined round trip."""
+    pipe = redis_client.pipeline(transaction=False)
+    queued = 0
+    for poll_id, action_type, topics in events:
+        weight = TRENDING_WEIGHTS.get(action_type)
+        if not weight or not poll_id:
+            continue
+        _record(keys=_record_keys(topics), args=[str(poll_id), weight, TRENDING_HALF_LIFE], client=pipe)
+        queued += 1
+    if not queued:
+        return
+    try:
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"⚠️ Failed to record trending events: {e}")
+
+
+def get_trending(limit=10, topic=None):
+    """Top poll ids by decayed engagement, highest first."""
+    key = topic_key(topic) if topic else TRENDING_KEY
+    try:
+        return redis_client.zrevrange(key, 0, limit - 1)
+    except redis.RedisError as e:
+        print(f"⚠️ Failed to read trending polls: {e}")
+        return []
+
+
+def remove_polls(*poll_ids):
+    """Drop polls from every trending set (closed, expired or deleted)."""
+    if not poll_ids:
+        return
+    members = [str(poll_id) for poll_id in poll_ids]
+    try:
+        keys = list(redis_client.smembers(TOPIC_KEYS_SET)) + [TRENDING_KEY]
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.zrem(key, *members)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"⚠️ Failed to remove polls from trending: {e}")
+
+
+def prune_closed(collection):
+    """Remove polls that are no longer public, active and open, and cap every set at TRENDING_MAX_ENTRIES."""
+    members = redis_client.zrange(TRENDING_KEY, 0, -1)
+    ids = []
+    for member in members:
+        try:
+            ids.append(ObjectId(member))
+        except InvalidId:
+            pass
+    now = datetime.now(timezone.utc)
+    open_ids = {
+        str(poll["_id"]) for poll in collection.find(
+            {"_id": {"$in": ids}, "visibility": "public", "isActive": True, "expiresAt": {"$gt": now}}, {"_id": 1}
+        )
+    }
+    closed = [member for member in members if member not in open_ids]
+    if closed:
+        remove_polls(*closed)
+
+    pipe = redis_client.pipeline(transaction=False)
+    for key in list(redis_client.smembers(TOPIC_KEYS_SET)) + [TRENDING_KEY]:
+        pipe.zremrangebyrank(key, 0, -(TRENDING_MAX_ENTRIES + 1))
+    pipe.execute()
+    return len(closed)
+
+
+def rebase_if_due():
+    """Rescale all scores to a fresh epoch once the decay exponent has grown large."""
+    epoch = redis_client.get(EPOCH_KEY)
+    if epoch and time.time() - float(epoch) > TRENDING_REBASE_AFTER:
+        _rebase(keys=[EPOCH_KEY, TOPIC_KEYS_SET, TRENDING_KEY], args=[TRENDING_HALF_LIFE, TRENDING_MIN_SCORE])
+        return True
+    return False
+
+
+class TrendingMaintainer:
+    """Background thread that prunes closed polls from the trending sets and rebases their scores."""
+
+    def __init__(self, collection, interval=TRENDING_MAINTAIN_INTERVAL):
+        self.collection = collection
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="trending-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def maintain(self):
+        try:
+            rebase_if_due()
+            prune_closed(self.collection)
+        except (redis.RedisError, PyMongoError) as e:
+            print(f"❌ Trending maintenance failed: {e}")
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.maintain()
@@ -0,0 +1,67 @@
+import os
+import threading
+
+# Votes are coalesced per poll and the poll's current tally is pushed once per
+# tick to its room, so outbound traffic scales with subscribers per poll rather
+# than every vote. Sending absolute counts (not deltas) means a client that
+# missed an update, or another worker's broadcast, still converges.
+VOTE_BROADCAST_TICK = float(os.getenv("VOTE_BROADCAST_TICK", 0.2))  # Seconds
+
+
+def poll_room(poll_id):
+    """Socket.IO room name for clients following a poll."""
+    return f"poll:{poll_id}"
+
+
+class VoteBroadcaster:
+    """Collects polls that received votes and emits one vote_update with each poll's tally per tick."""
+
+    def __init__(self, socketio, tick=VOTE_BROADCAST_TICK):
+        self.socketio = socketio
+        self.tick = tick
+        self._pending = set()  # Poll ids voted on since the last tick
+        self._lock = threading.Lock()
+        self._started = False
+        self._poll_model = None
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.socketio.start_background_task(self._run)
+
+    def queue_vote(self, poll_id):
+        """Mark a poll as changed so its tally goes out with the next tick."""
+        if not self._started:
+            self.start()
+        with self._lock:
+            self._pending.add(str(poll_id))
+
+    def get_tally(self, poll_id):
+        if self._poll_model is None:
+            from models.Poll import Poll  # Deferred: models import utils
+            self._poll_model = Poll()
+        tally = self._poll_model.get_poll(poll_id, view="tally")
+        return {
+            "poll_id": poll_id,
+            "votes": {str(option["optionId"]): option["voteCount"] for option in tally["options"]},
+            "total": tally["totalVotes"],
+            "isActive": tally["isActive"],
+        }
+
+    def flush(self):
+        """Emit the current tally of every poll voted on since the previous tick."""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+
+        for poll_id in pending:
+            try:
+                self.socketio.emit("vote_update", self.get_tally(poll_id), to=poll_room(poll_id))
+            except Exception as e:
+                print(f"❌ Emission failed for poll {poll_id}: {e}")
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.tick)
+            self.flush()
@@ -0,0 +1,286 @@
+import os
+import random
+import threading
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError, BulkWriteError
+from bson import ObjectId
+
+from utils.redis_session import redis_client
+from utils import poll_cache
+
+# Vote counters are spread over several Redis hashes per poll so a viral poll
+# is not a single hot key, and are folded into Mongo in batches by the flusher.
+VOTE_COUNTER_SHARDS = int(os.getenv("VOTE_COUNTER_SHARDS", 8))
+VOTE_FLUSH_INTERVAL = float(os.getenv("VOTE_FLUSH_INTERVAL", 1.0))  # Seconds
+VOTE_FLUSH_BATCH_SIZE = int(os.getenv("VOTE_FLUSH_BATCH_SIZE", 500))
+# Seconds before a flush that never finished is assumed dead and its drained
+# counts are picked up again. Must comfortably exceed one bulk_write.
+VOTE_FLUSH_CLAIM_TIMEOUT = int(os.getenv("VOTE_FLUSH_CLAIM_TIMEOUT", 60))
+
+DIRTY_POLLS_KEY = "vote_counts:dirty"
+CLAIMS_KEY = "vote_counts:processing"  # ZSET {poll_id: claimed at} of polls being written to Mongo
+FLUSHED_TTL = 7 * 24 * 3600  # Seconds a poll's flushed-vote counter outlives its last flush
+TOTAL_FIELD = "total"
+OPTION_PREFIX = "option:"
+
+
+def shard_key(poll_id, shard):
+    return f"vote_counts:{poll_id}:{shard}"
+
+
+def processing_key(poll_id):
+    """Counts drained from the shards but not yet confirmed written to Mongo."""
+    return f"vote_counts:processing:{poll_id}"
+
+
+def flushed_key(poll_id):
+    """Running total of votes this poll has had flushed into Mongo."""
+    return f"vote_counts:flushed:{poll_id}"
+
+
+# KEYS: target shard, dirty set, flushed counter, every shard, processing hash
+# ARGV: option field, poll id, total field, requiredVotes, currentVotes, flushed counter before the read
+# Votes flushed since the caller's read are in Mongo but not in its currentVotes,
+# so they are added back; the total is at worst an overcount, never an undercount.
+RECORD_VOTE_LUA = """
+local flushed = tonumber(redis.call('GET', KEYS[3]) or 0)
+local total = tonumber(ARGV[5]) + math.max(flushed - tonumber(ARGV[6]), 0)
+for i = 4, #KEYS do
+    total = total + tonumber(redis.call('HGET', KEYS[i], ARGV[3]) or 0)
+end
+if total >= tonumber(ARGV[4]) then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+redis.call('HINCRBY', KEYS[1], ARGV[3], 1)
+redis.call('SADD', KEYS[2], ARGV[2])
+return 1
+"""
+_record_vote = redis_client.register_script(RECORD_VOTE_LUA)
+
+
+def get_flushed_count(poll_id):
+    """Read before loading the poll from Mongo; record_vote uses it to catch flushes since."""
+    return int(redis_client.get(flushed_key(str(poll_id))) or 0)
+
+
+def record_vote(poll_id, option_id, required_votes, current_votes, flushed_before):
+    """
+    Count a vote in a random shard of the poll's Redis counters, unless the
+    poll's votes (currentVotes as read from Mongo, plus anything flushed since
+    that read, plus unflushed counts) already reach required_votes. The check
+    and the increment run in one script, so concurrent voters and a concurrent
+    flush cannot overshoot. Returns True if the vote was counted.
+    """
+    poll_id = str(poll_id)
+    shards = [shard_key(poll_id, shard) for shard in range(VOTE_COUNTER_SHARDS)]
+    keys = [random.choice(shards), DIRTY_POLLS_KEY, flushed_key(poll_id)] + shards + [processing_key(poll_id)]
+    args = [f"{OPTION_PREFIX}{option_id}", poll_id, TOTAL_FIELD, required_votes, current_votes, flushed_before]
+    return bool(_record_vote(keys=keys, args=args))
+
+
+def _sum_shards(shards):
+    """Fold a list of shard hashes into {"total": n, "options": {option_id: n}}."""
+    counts = {"total": 0, "options": {}}
+    for shard in shards:
+        for field, value in (shard or {}).items():
+            value = int(value)
+            if field == TOTAL_FIELD:
+                counts["total"] += value
+            elif field.startswith(OPTION_PREFIX):
+                option_id = int(field[len(OPTION_PREFIX):])
+                counts["options"][option_id] = counts["options"].get(option_id, 0) + value
+    return counts
+
+
+def get_pending_counts(poll_id):
+    """Return the votes for a poll that have not been flushed to Mongo yet."""
+    pipe = redis_client.pipeline(transaction=False)
+    for shard in range(VOTE_COUNTER_SHARDS):
+        pipe.hgetall(shard_key(str(poll_id), shard))
+    pipe.hgetall(processing_key(str(poll_id)))
+    return _sum_shards(pipe.execute())
+
+
+def merge_pending_counts(poll):
+    """Add unflushed Redis counts onto a serialized poll document."""
+    if not poll:
+        return poll
+    pending = get_pending_counts(poll["_id"])
+    if not pending["total"]:
+        return poll
+
+    for option in poll.get("options", []):
+        option["voteCount"] = option.get("voteCount", 0) + pending["options"].get(option.get("optionId"), 0)
+    poll["totalVotes"] = poll.get("totalVotes", 0) + pending["total"]
+    poll["currentVotes"] = poll.get("currentVotes", 0) + pending["total"]
+    if "engagementMetrics" in poll:
+        poll["engagementMetrics"]["votes"] = poll["engagementMetrics"].get("votes", 0) + pending["total"]
+    return poll
+
+
+# KEYS: processing hash, claims zset, every shard  ARGV: poll id, claim timeout
+# Moves the shards into the processing hash, on top of anything a failed flush
+# left there, unless another live flusher is still writing this poll.
+DRAIN_LUA = """
+local now = tonumber(redis.call('TIME')[1])
+local claimed = redis.call('ZSCORE', KEYS[2], ARGV[1])
+if claimed and now - tonumber(claimed) < tonumber(ARGV[2]) then
+    return false
+end
+for i = 3, #KEYS do
+    local fields = redis.call('HGETALL', KEYS[i])
+    for j = 1, #fields, 2 do
+        redis.call('HINCRBY', KEYS[1], fields[j], fields[j + 1])
+    end
+    redis.call('DEL', KEYS[i])
+end
+redis.call('ZADD', KEYS[2], now, ARGV[1])
+return redis.call('HGETALL', KEYS[1])
+"""
+_drain = redis_client.register_script(DRAIN_LUA)
+
+
+def _drain_poll(poll_id):
+    """
+    Claim a poll and move its shard counts into its processing hash. Returns the
+    counts to write, or None if another flusher currently holds the poll.
+    """
+    keys = [processing_key(poll_id), CLAIMS_KEY] + [shard_key(poll_id, shard) for shard in range(VOTE_COUNTER_SHARDS)]
+    fields = _drain(keys=keys, args=[poll_id, VOTE_FLUSH_CLAIM_TIMEOUT])
+    if fields is None:
+        return None
+    return _sum_shards([dict(zip(fields[::2], fields[1::2]))])
+
+
+def _release_poll(poll_id, flushed=0):
+    """The processing counts reached Mongo: move them to the flushed counter and drop the claim."""
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(processing_key(poll_id))
+    pipe.zrem(CLAIMS_KEY, poll_id)
+    if flushed:
+        pipe.incrby(flushed_key(poll_id), flushed)
+        pipe.expire(flushed_key(poll_id), FLUSHED_TTL)
+    pipe.execute()
+
+
+def _retry_poll(poll_id):
+    """The write did not apply: keep the processing counts and queue the poll again."""
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.zrem(CLAIMS_KEY, poll_id)
+    pipe.sadd(DIRTY_POLLS_KEY, poll_id)
+    pipe.execute()
+
+
+def recover_stale_claims(timeout=VOTE_FLUSH_CLAIM_TIMEOUT):
+    """Re-queue polls whose flusher died between draining and releasing them."""
+    now, _ = redis_client.time()
+    stale = redis_client.zrangebyscore(CLAIMS_KEY, "-inf", now - timeout)
+    if stale:
+        redis_client.sadd(DIRTY_POLLS_KEY, *stale)
+    return len(stale)
+
+
+def _build_poll_updates(poll_id, counts):
+    """Build the $inc update and the vote-limit close for one poll."""
+    increments = {
+        "totalVotes": counts["total"],
+        "currentVotes": counts["total"],
+        "engagementMetrics.votes": counts["total"]
+    }
+    array_filters = []
+    for i, (option_id, value) in enumerate(counts["options"].items()):
+        increments[f"options.$[o{i}].voteCount"] = value
+        array_filters.append({f"o{i}.optionId": option_id})
+
+    return [
+        UpdateOne({"_id": ObjectId(poll_id)}, {"$inc": increments}, array_filters=array_filters or None),
+        UpdateOne(
+            {"_id": ObjectId(poll_id), "isActive": True, "$expr": {"$gte": ["$currentVotes", "$requiredVotes"]}},
+            {"$set": {"isActive": False}}
+        )
+    ]
+
+
+def flush_vote_counts(collection, batch_size=VOTE_FLUSH_BATCH_SIZE):
+    """
+    Fold pending Redis vote counts into Mongo with one bulk_write per batch.
+    Drained counts stay in a per-poll processing hash until their write is
+    confirmed, so a failed bulk_write neither loses votes nor re-applies the
+    polls that did reach Mongo, and a flusher that dies mid-write leaves its
+    counts to be recovered after VOTE_FLUSH_CLAIM_TIMEOUT.
+    """
+    recover_stale_claims()
+    poll_ids = redis_client.spop(DIRTY_POLLS_KEY, batch_size) or []
+    drained = {}
+    first_op = {}  # {poll_id: index of its $inc in operations}
+    operations = []
+    for poll_id in poll_ids:
+        counts = _drain_poll(poll_id)
+        if counts is None:  # Another flusher is mid-write; pick the poll up again after it releases
+            redis_client.sadd(DIRTY_POLLS_KEY, poll_id)
+            continue
+        if not counts["total"]:
+            _release_poll(poll_id)
+            continue
+        drained[poll_id] = counts
+        first_op[poll_id] = len(operations)
+        operations.extend(_build_poll_updates(poll_id, counts))
+
+    if not operations:
+        return 0
+
+    try:
+        collection.bulk_write(operations, ordered=True)
+        applied = list(drained)
+    except BulkWriteError as e:
+        # Ordered: everything before the first failed operation was applied
+        failed_at = e.details["writeErrors"][0]["index"]
+        applied = [poll_id for poll_id, index in first_op.items() if index < failed_at]
+        print(f"❌ Error flushing vote counts, {len(drained) - len(applied)} polls will be retried: {e}")
+    except PyMongoError as e:
+        print(f"❌ Error flushing vote counts: {e}")
+        for poll_id in drained:
+            _retry_poll(poll_id)
+        raise
+
+    for poll_id in applied:
+        _release_poll(poll_id, drained[poll_id]["total"])
+    for poll_id in drained.keys() - set(applied):
+        _retry_poll(poll_id)
+    poll_cache.invalidate(*applied)  # Counts moved from Redis into the documents
+    return len(applied)
+
+
+class VoteCounterFlusher:
+    """Background thread that periodically flushes Redis vote counters into Mongo."""
+
+    def __init__(self, collection, interval=VOTE_FLUSH_INTERVAL):
+        self.collection = collection
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="vote-counter-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()  # Do not leave counts behind on shutdown
+
+    def flush(self):
+        try:
+            while flush_vote_counts(self.collection):
+                pass
+        except Exception as e:
+            print(f"❌ Vote counter flush failed: {e}")
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.flush()
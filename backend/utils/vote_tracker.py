@@ -1,21 +1,21 @@
 import tkinter as tk
 import socketio
 import threading
+import sys
 
 # Initialize WebSocket client with debugging logs
 sio = socketio.Client(logger=True, engineio_logger=True)
 votes = {}  # Dictionary to store live vote counts
+poll_ids = sys.argv[1:]  # Polls to follow, e.g. python vote_tracker.py <poll_id> ...
 
-def update_votes(poll_id, vote):
-    """Update the vote count and refresh the UI."""
-    if poll_id not in votes:
-        votes[poll_id] = {}
-    votes[poll_id][vote] = votes[poll_id].get(vote, 0) + 1
+def update_votes(poll_id, tally):
+    """Replace the poll's counts with the broadcast tally and refresh the UI."""
+    votes[poll_id] = dict(tally)
 
     # Schedule the UI update on the main thread
-    root.after(0, lambda: update_ui(poll_id, vote))
+    root.after(0, lambda: update_ui(poll_id))
 
-def update_ui(poll_id, vote):
+def update_ui(poll_id):
     """Efficiently update only the changed part of the UI."""
     text.config(state=tk.NORMAL)  # Enable editing for update
     
@@ -40,13 +40,19 @@ def update_ui(poll_id, vote):
 
 @sio.on("vote_update")
 def handle_vote_update(data):
-    """Handle incoming WebSocket vote updates."""
+    """Handle incoming WebSocket vote updates (the poll's full tally, at most once per tick)."""
     print(f"📩 Received vote update: {data}")  # Debugging
     poll_id = data["poll_id"]
-    vote = data["vote"]
+    tally = data["votes"]
 
     # Call update_votes in a thread-safe manner
-    root.after(0, lambda: update_votes(poll_id, vote))
+    root.after(0, lambda: update_votes(poll_id, tally))
+
+@sio.on("connect")
+def handle_connect():
+    """Subscribe to the rooms of the followed polls (re-run on reconnect)."""
+    for poll_id in poll_ids:
+        sio.emit("subscribe_poll", {"poll_id": poll_id})
 
 def connect_to_server():
     """Connect WebSocket once, avoiding duplicate connections."""